@@ -0,0 +1,375 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import struct
+import time
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qsl
+
+from anyio import to_thread
+from starlette.datastructures import Headers
+from starlette.routing import compile_path
+
+from app.api.responses import ARROW_STREAM, pa
+from app.api.single_flight import flights
+from app.services import dataset_service, ml_service
+from app.services.disk_cache import disk
+from app.services.result_cache import MB, StatsCache
+
+try:
+    import brotli
+except ImportError:         # optional: gzip only without it
+    brotli = None
+
+# ===========================
+# ENCODED RESPONSE CACHE
+# ===========================
+#
+# ASGI middleware in front of the analytics routes. A successful GET is
+# stored as its final bytes, identity plus gzip and brotli, under
+#
+#     (path, sorted query, representation, dataset version)
+#
+# so a hit picks the encoding the client accepts and writes it out: no
+# pandas, no JSON/Arrow encoding, no compression. The LRU (a result_cache
+# StatsCache, reported as "responses") is bounded by total stored bytes
+# and holds one entry per (path, query, representation); what happens when
+# the dataset version moves on is the route's policy (see
+# STALE-WHILE-REVALIDATE below).
+#
+# A route whose policy sets ``max_bytes`` and/or ``ttl`` gets a cache of
+# its own instead, reported as "responses <route>": its entries neither
+# evict nor are evicted by other routes', and with a ttl they expire that
+# many seconds after being stored, whatever their version.
+
+CACHED_PREFIXES = (
+    "/api/price-trends", "/api/location", "/api/features", "/api/quality",
+    "/api/utilities", "/api/aggregate", "/api/map",
+)
+
+MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_BYTES", str(64 * 1024 * 1024)))
+MIN_COMPRESS = 512          # smaller bodies are stored identity-only
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Headers of the original response a cached copy keeps
+KEPT_HEADERS = ("content-type", "x-total-count", "x-next-cursor")
+
+UNROUTED = "(unrouted)"     # metrics label of paths no route matches
+
+# ===========================
+# CONDITIONAL REQUESTS
+# ===========================
+#
+# Every cached route also carries a strong ETag derived from the same key
+# plus the model version, and one per content-encoding ("...-gzip",
+# "...-br") since the bytes differ. ``If-None-Match`` is compared before
+# the route runs, so revalidating an unchanged result costs one hash.
+
+MAX_AGE = int(os.environ.get("HTTP_CACHE_MAX_AGE", "0"))
+CACHE_CONTROL = f"public, max-age={MAX_AGE}, must-revalidate"
+
+
+def etag(key, encoding="identity"):
+    digest = hashlib.sha1(repr(key + (ml_service.MODEL_VERSION,)).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+
+
+def not_modified(key, if_none_match):
+    """The encoding whose current ETag ``If-None-Match`` names, or None.
+
+    ``*`` is ignored: it would match every encoding of every response, so
+    it cannot say which representation the client already has.
+    """
+    if not if_none_match:
+        return None
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    for encoding in ("identity", "gzip", "br"):
+        if etag(key, encoding) in tags:
+            return encoding
+    return None
+
+
+# ===========================
+# STALE-WHILE-REVALIDATE
+# ===========================
+#
+# Each route has a CachePolicy, set with ``@cache_policy(stale_ttl)``
+# under its ``@router.get`` (DEFAULT_POLICY otherwise), and every entry
+# keeps the policy of the run that produced it. An entry computed for an
+# older dataset version is, counted from the last time a request found it
+# current:
+#
+#   age < stale_ttl               served as stale (X-Cache: stale), one
+#                                 background refresh recomputes it for
+#                                 the current version
+#   older                         recomputed in the request
+#
+# An entry of the current version is always fresh: recomputing it would
+# produce the same bytes.
+
+
+class CachePolicy(NamedTuple):
+    stale_ttl: float                # seconds a superseded entry may still be served
+    ttl: Optional[float] = None     # seconds any entry lives (own cache); None: until evicted
+    max_bytes: Optional[int] = None # the route's own byte budget; None: the shared cache
+
+    @property
+    def own_cache(self):
+        return self.ttl is not None or self.max_bytes is not None
+
+
+DEFAULT_POLICY = CachePolicy(float(os.environ.get("ROUTE_CACHE_STALE_TTL", "60")))
+ROUTE_MAX_BYTES = 8 * MB    # own cache of a route that sets only a ttl
+
+
+def cache_policy(stale_ttl, ttl=None, max_bytes=None):
+    """Route decorator, placed under ``@router.get``: this route's CachePolicy."""
+    def mark(endpoint):
+        endpoint.cache_policy = CachePolicy(stale_ttl, ttl, max_bytes)
+        return endpoint
+    return mark
+
+
+def route_policy(scope):
+    # The router leaves the matched endpoint in the scope it was handed
+    return getattr(scope.get("endpoint"), "cache_policy", DEFAULT_POLICY)
+
+
+class Entry:
+    """One response: status, kept headers and the body in each encoding."""
+
+    __slots__ = ("key", "policy", "confirmed", "status", "headers", "bodies")
+
+    def __init__(self, key, policy, status, headers, body):
+        self.key = key                      # full cache key, dataset version included
+        self.policy = policy                # of the route that produced it
+        self.confirmed = time.monotonic()   # last time it matched the current version
+        self.status = status
+        self.headers = headers
+        self.bodies = {"identity": body}
+        if len(body) >= MIN_COMPRESS:
+            self.bodies["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    @property
+    def nbytes(self):
+        return sum(len(body) for body in self.bodies.values())
+
+    def pack(self):
+        """Bytes for the disk cache: a length-prefixed JSON header, then each body."""
+        meta = json.dumps({
+            "status": self.status,
+            "headers": self.headers,
+            "bodies": [[encoding, len(body)] for encoding, body in self.bodies.items()],
+            "policy": self.policy._asdict(),
+        }).encode("utf-8")
+        return struct.pack(">I", len(meta)) + meta + b"".join(self.bodies.values())
+
+    @classmethod
+    def unpack(cls, key, blob):
+        """The entry ``pack`` wrote."""
+        size = struct.unpack_from(">I", blob)[0]
+        meta = json.loads(blob[4:4 + size])
+
+        entry = cls.__new__(cls)
+        entry.key = key
+        policy = meta.get("policy")
+        entry.policy = CachePolicy(**policy) if isinstance(policy, dict) else DEFAULT_POLICY
+        entry.confirmed = time.monotonic()
+        entry.status = meta["status"]
+        entry.headers = [tuple(header) for header in meta["headers"]]
+        entry.bodies = {}
+        offset = 4 + size
+        for encoding, length in meta["bodies"]:
+            entry.bodies[encoding] = blob[offset:offset + length]
+            offset += length
+        return entry
+
+    def pick(self, accept_encoding):
+        accepted = _accepted(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.bodies and encoding in accepted:
+                return encoding, self.bodies[encoding]
+        return "identity", self.bodies["identity"]
+
+
+def _accepted(accept_encoding):
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def cache_key(scope, headers):
+    query = tuple(sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)))
+    representation = "arrow" if pa is not None and ARROW_STREAM in headers.get("accept", "") else "json"
+    return scope["path"], query, representation, dataset_service.dataset_version()
+
+
+class ResponseCacheMiddleware:
+
+    def __init__(self, app, max_bytes=MAX_BYTES):
+        self.app = app
+        self.cache = StatsCache("responses", max_bytes, getsizeof=lambda entry: entry.nbytes)
+        self.templates = None       # [(regex, path template)] of the app's routes
+        self.route_caches = {}      # path template -> StatsCache, for policies with their own
+        self.refreshing = set()     # keys with a background refresh running
+        self.tasks = set()
+
+    def _route(self, scope):
+        """The path template of the route serving ``scope``, for per-route metrics.
+
+        Resolved from the app's OpenAPI paths (prefixes included), so
+        metrics are bounded by the routes, not by the paths requested.
+        """
+        if self.templates is None:
+            paths = scope["app"].openapi().get("paths", {}) if "app" in scope else {}
+            self.templates = [(compile_path(path)[0], path) for path in paths]
+        for regex, template in self.templates:
+            if regex.match(scope["path"]):
+                return template
+        return UNROUTED
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith(CACHED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        key = await to_thread.run_sync(cache_key, scope, headers)
+        route = self._route(scope)
+        entry, state = self._lookup(key, route, scope)
+
+        # Validators describe what would be served, which may be a stale entry
+        served = entry.key if entry is not None else key
+        matched = not_modified(served, headers.get("if-none-match"))
+        if matched is not None:
+            await _send(send, 304, _validators(served, matched), b"")
+            return
+
+        if entry is None:
+            # Identical requests arriving meanwhile wait for this one run
+            (entry, uncached), coalesced = await flights.do(
+                key, route, lambda: self._compute(key, route, scope, receive),
+            )
+            if uncached is not None:
+                await _send(send, *uncached)
+                return
+            state = "coalesced" if coalesced else "miss"
+
+        encoding, body = entry.pick(headers.get("accept-encoding", ""))
+        raw = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in entry.headers]
+        raw += _validators(entry.key, encoding)
+        raw.append((b"x-cache", state.encode("latin-1")))
+        if encoding != "identity":
+            raw.append((b"content-encoding", encoding.encode("latin-1")))
+        await _send(send, entry.status, raw, body)
+
+    def _cache(self, route, policy=None):
+        """The cache holding ``route``'s entries; ``policy`` creates its own if it asks for one."""
+        cache = self.route_caches.get(route)
+        if cache is None and policy is not None and policy.own_cache:
+            cache = self.route_caches[route] = StatsCache(
+                f"responses {route}", policy.max_bytes or ROUTE_MAX_BYTES, policy.ttl,
+                getsizeof=lambda entry: entry.nbytes,
+            )
+        return cache or self.cache
+
+    def _put(self, route, entry):
+        self._cache(route, entry.policy).put(entry.key[:-1], entry)
+
+    def _lookup(self, key, route, scope):
+        """The entry to serve for ``key`` (or None) and its X-Cache state."""
+        entry = self._cache(route).get(key[:-1])
+        if entry is None:
+            return None, None
+        if entry.key == key:
+            entry.confirmed = time.monotonic()
+            return entry, "hit"
+
+        age = time.monotonic() - entry.confirmed
+        if age < entry.policy.stale_ttl:
+            self._revalidate(key, route, scope)
+            return entry, "stale"
+        return None, None
+
+    def _revalidate(self, key, route, scope):
+        if key in self.refreshing:
+            return
+        self.refreshing.add(key)
+        task = asyncio.get_running_loop().create_task(self._refresh(key, route, dict(scope)))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _refresh(self, key, route, scope):
+        try:
+            await flights.do(key, route, lambda: self._compute(key, route, scope, _no_body))
+        except Exception as e:
+            # Keep serving the stale entry; the next stale hit tries again
+            print(f"Warning: background refresh of {scope['path']} failed: {e}")
+        finally:
+            self.refreshing.discard(key)
+
+    async def _compute(self, key, route, scope, receive):
+        """``(entry, None)`` for a cacheable response, else ``(None, (status, headers, body))``.
+
+        The disk cache is consulted first: another worker, or this one
+        before a restart, may already have encoded this exact version.
+        """
+        disk_key = etag(key).strip('"')
+        blob = await to_thread.run_sync(disk.get, "responses", disk_key)
+        if blob is not None:
+            entry = Entry.unpack(key, blob)
+            self._put(route, entry)
+            return entry, None
+
+        status, response_headers, body = await self._run(scope, receive)
+        if status != 200 or "content-encoding" in response_headers:
+            return None, (status, list(response_headers.raw), body)
+
+        kept = [(name, response_headers[name]) for name in KEPT_HEADERS if name in response_headers]
+        entry = await to_thread.run_sync(Entry, key, route_policy(scope), status, kept, body)
+        self._put(route, entry)
+        await to_thread.run_sync(disk.put, "responses", disk_key, entry.pack())
+        return entry, None
+
+    async def _run(self, scope, receive):
+        """Run the app and collect its whole response."""
+        status, headers, chunks = 500, None, []
+
+        async def capture(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = Headers(raw=message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        return status, headers or Headers(raw=[]), b"".join(chunks)
+
+
+async def _no_body():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+def _validators(key, encoding):
+    return [
+        (b"etag", etag(key, encoding).encode("latin-1")),
+        (b"cache-control", CACHE_CONTROL.encode("latin-1")),
+        (b"vary", b"Accept, Accept-Encoding"),
+    ]
+
+
+async def _send(send, status, raw_headers, body):
+    raw = [(name, value) for name, value in raw_headers if name.lower() != b"content-length"]
+    if status != 304:
+        raw.append((b"content-length", str(len(body)).encode("latin-1")))
+    await send({"type": "http.response.start", "status": status, "headers": raw})
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,103 @@
+import io
+import json
+from contextvars import ContextVar
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:         # optional: plain json is used without it
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:         # optional: Arrow is only offered when installed
+    pa = None
+
+# ===========================
+# RESPONSE ENCODING
+# ===========================
+#
+# Table endpoints answer in one of two JSON shapes:
+#
+#   records   [{col: value, ...}, ...]        (default, one dict per row)
+#   columns   {"columns": [...], "data": {col: [...]}}
+#
+# The columnar shape hands numeric columns to orjson as numpy arrays, so
+# neither per-row dicts nor per-value Python objects are built.
+#
+# Clients that send ``Accept: application/vnd.apache.arrow.stream`` get
+# single-table responses as an Arrow IPC stream instead of JSON.
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+_accepts_arrow = ContextVar("accepts_arrow", default=False)
+
+TableFormat = Literal["records", "columns"]
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content):
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (numpy-aware) when it is installed."""
+
+    def render(self, content):
+        return dumps(content)
+
+
+def _column(series):
+    if pd.api.types.is_numeric_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype):
+        return np.ascontiguousarray(series.to_numpy())
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def encode_table(frame, format="records"):
+    """``frame`` as JSON-ready content in the requested table ``format``."""
+    if format == "columns":
+        return {
+            "columns": [str(name) for name in frame.columns],
+            "data": {str(name): _column(frame[name]) for name in frame.columns},
+        }
+    return frame.to_dict(orient="records")
+
+
+async def negotiate(request: Request):
+    """App-wide dependency: remember whether this request accepts Arrow."""
+    _accepts_arrow.set(pa is not None and ARROW_STREAM in request.headers.get("accept", ""))
+
+
+def arrow_stream(frame):
+    arrow_table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue()
+
+
+def table(frame, format="records", headers=None):
+    headers = {**(headers or {}), "Vary": "Accept"}
+    if _accepts_arrow.get():
+        return Response(arrow_stream(frame), media_type=ARROW_STREAM, headers=headers)
+    return FastJSONResponse(encode_table(frame, format), headers=headers)
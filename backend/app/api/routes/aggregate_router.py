@@ -0,0 +1,29 @@
+from typing import Optional
+
+from fastapi import APIRouter
+from app.api.response_cache import cache_policy
+from app.api.responses import TableFormat, table
+from app.services.aggregate_service import PRICE
+from app.services.query_service import aggregate
+from app.services.result_cache import MB
+
+router = APIRouter()
+
+# ============================
+# GENERIC AGGREGATION
+# ============================
+
+@router.get("/aggregate")
+# Ad-hoc queries: cheap on the cube, want live numbers. Their own budget
+# keeps one-off URLs from evicting the dashboard routes; the ttl drops them.
+@cache_policy(stale_ttl=5, ttl=300, max_bytes=8 * MB)
+def aggregate_query(
+    by: str,
+    metric: str = "mean",
+    value: str = PRICE,
+    where: Optional[str] = None,
+    sort: str = "key",
+    format: TableFormat = "records"
+):
+    data = aggregate(by, metric=metric, value=value, where=where, sort=sort)
+    return table(data, format)
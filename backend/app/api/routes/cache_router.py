@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from app.services import result_cache
+from app.services.disk_cache import disk
+
+router = APIRouter()
+
+# ============================
+# CACHE STATS
+# ============================
+
+@router.get("/cache/stats")
+def cache_stats():
+    # In-process caches of this worker ("responses <route>" for routes with their
+    # own budget or ttl), plus the node's shared disk tier
+    return {**result_cache.stats(), "disk": disk.stats()}
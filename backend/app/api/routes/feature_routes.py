@@ -1,79 +1,68 @@
-from fastapi import APIRouter
-import pandas as pd
-import os
+from typing import Annotated, Optional
 
-router = APIRouter()
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
-
-DATA_PATH = os.path.join(BASE_DIR, "data", "house_prices1.csv")
+from fastapi import APIRouter, Query
+from app.api.responses import TableFormat, table
+from app.schemas.schema import ScatterQuery
+from app.services.query_service import aggregate, filtered_chunks
+from app.services.sampling_service import scatter_page
 
-def load_data():
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f"CSV file not found: {DATA_PATH}")
-
-    df = pd.read_csv(DATA_PATH)
-
-    return df
+router = APIRouter()
 
 @router.get("/features/building-types")
-def building_types():
-    df = load_data()
-    data = df["Building Type"].value_counts().reset_index()
-    data.columns = ["Type", "Count"]
-    return data.to_dict(orient="records")
+def building_types(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Building Type", metric="count", sort="desc", where=where).rename(columns={"Building Type": "Type"})
+    return table(data, format)
 
 @router.get("/features/house-styles")
-def house_styles():
-    df = load_data()
-    data = df["House Style"].value_counts().reset_index()
-    data.columns = ["Style", "Count"]
-    return data.to_dict(orient="records")
+def house_styles(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("House Style", metric="count", sort="desc", where=where).rename(columns={"House Style": "Style"})
+    return table(data, format)
 
 @router.get("/features/foundations")
-def foundations():
-    df = load_data()
-    data = df["Foundation Type"].value_counts().reset_index()
-    data.columns = ["Foundation", "Count"]
-    return data.to_dict(orient="records")
+def foundations(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Foundation Type", metric="count", sort="desc", where=where).rename(columns={"Foundation Type": "Foundation"})
+    return table(data, format)
 
 @router.get("/features/living-area-impact")
-def living_area_impact():
-    df = load_data()
-    return df[["Above Ground Living Area", "House Sale Price", "Overall Material Quality", "Total Basement Area"]]\
-        .dropna().to_dict(orient="records")
+def living_area_impact(params: Annotated[ScatterQuery, Query()]):
+    chunks = filtered_chunks(
+        ["Above Ground Living Area", "House Sale Price", "Overall Material Quality", "Total Basement Area"],
+        params.clauses()
+    )
+    page = scatter_page(("living-area-impact", params.clauses()), (chunk.dropna() for chunk in chunks), params, x="Above Ground Living Area")
+    return table(page.rows, params.format, headers=page.headers())
 
 @router.get("/features/floor-impact")
-def floor_impact():
-    df = load_data()
-    df["Total Floors"] = df["First Floor Area"] + df["Second Floor Area"]
-    return df[["Total Floors", "House Sale Price"]].dropna().to_dict(orient="records")
+def floor_impact(params: Annotated[ScatterQuery, Query()]):
+    chunks = (
+        chunk.assign(**{"Total Floors": chunk["First Floor Area"] + chunk["Second Floor Area"]})[["Total Floors", "House Sale Price"]]
+        for chunk in filtered_chunks(["First Floor Area", "Second Floor Area", "House Sale Price"], params.clauses())
+    )
+    page = scatter_page(("floor-impact", params.clauses()), (chunk.dropna() for chunk in chunks), params, x="Total Floors")
+    return table(page.rows, params.format, headers=page.headers())
 
 @router.get("/features/bedrooms")
-def bedroom_impact():
-    df = load_data()
-    data = df.groupby("Bedrooms Above Ground")["House Sale Price"].mean().reset_index()
-    return data.to_dict(orient="records")
+def bedroom_impact(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Bedrooms Above Ground", where=where)
+    return table(data, format)
 
 @router.get("/features/bathrooms")
-def bathroom_impact():
-    df = load_data()
-    data = df.groupby("Full Bathrooms")["House Sale Price"].mean().reset_index()
-    return data.to_dict(orient="records")
+def bathroom_impact(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Full Bathrooms", where=where)
+    return table(data, format)
 
 @router.get("/features/garage")
-def garage_impact():
-    df = load_data()
-    data = df.groupby("Garage Capacity Cars")["House Sale Price"].mean().reset_index()
-    return data.to_dict(orient="records")
+def garage_impact(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Garage Capacity Cars", where=where)
+    return table(data, format)
 
 @router.get("/features/outdoor")
-def outdoor_features():
-    df = load_data()
-    return df[["Wood Deck Area", "Open Porch Area", "House Sale Price"]].dropna().to_dict(orient="records")
+def outdoor_features(params: Annotated[ScatterQuery, Query()]):
+    chunks = filtered_chunks(["Wood Deck Area", "Open Porch Area", "House Sale Price"], params.clauses())
+    page = scatter_page(("outdoor", params.clauses()), (chunk.dropna() for chunk in chunks), params, x="Wood Deck Area")
+    return table(page.rows, params.format, headers=page.headers())
 
 @router.get("/features/pool")
-def pool_quality():
-    df = load_data()
-    pool = df[df["Pool Area"] > 0].groupby("Pool Quality")["House Sale Price"].mean().reset_index()
-    return pool.to_dict(orient="records")
\ No newline at end of file
+def pool_quality(where: Optional[str] = None, format: TableFormat = "records"):
+    pool = aggregate("Pool Quality", where=";".join(filter(None, ["Pool Area>0", where])))
+    return table(pool, format)
\ No newline at end of file
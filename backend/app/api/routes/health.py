@@ -1,7 +1,22 @@
 from fastapi import APIRouter
+from app.api.single_flight import flights
+from app.services.dataset_service import dataset_info, memory_report
 
 router = APIRouter()
 
 @router.get("/health")
 def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@router.get("/health/dataset")
+def dataset_health():
+    return dataset_info()
+
+@router.get("/health/dataset/memory")
+def dataset_memory():
+    return memory_report()
+
+@router.get("/health/coalescing")
+def coalescing():
+    # Per-route single-flight counters of this worker
+    return flights.stats()
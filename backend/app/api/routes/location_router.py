@@ -1,108 +1,102 @@
-from fastapi import APIRouter
-import pandas as pd
-import os
+from typing import Annotated
 
-router = APIRouter()
-
-BASE_DIR = os.path.dirname(
-    os.path.dirname(
-        os.path.dirname(
-            os.path.dirname(
-                os.path.dirname(__file__)
-            )
-        )
-    )
-)
+from fastapi import APIRouter, Query
+from app.api.response_cache import cache_policy
+from app.api.responses import FastJSONResponse, encode_table
+from app.schemas.schema import RowQuery
+from app.services.aggregate_service import PRICE, get_aggregates
+from app.services.dataset_service import get_dataset
+from app.services.query_service import filtered_chunks, paginate
 
-DATA_PATH = os.path.join(BASE_DIR, "data", "house_prices1.csv")
+router = APIRouter()
 
-def load_data():
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f"CSV file not found: {DATA_PATH}")
 
-    return pd.read_csv(DATA_PATH)
+def with_median(summary, dataset, col):
+    # Means and counts are live. Medians are exact from the loaded frame, or
+    # come from the per-group quantile sketches when streaming or once sales
+    # have been ingested (the frame does not hold those).
+    if dataset.streaming or dataset.revision:
+        medians = get_aggregates().medians(col)
+    else:
+        medians = dataset.frame.groupby(col, observed=True)[PRICE].median()
 
+    median = summary[col].map(medians)
+    return median.astype(object).where(median.notna(), None)
 
 @router.get("/location/neighborhood")
-def neighborhood_comparison():
+@cache_policy(stale_ttl=300)
+def neighborhood_comparison(params: Annotated[RowQuery, Query()]):
 
-    df = load_data()
+    dataset = get_dataset()
+    aggs = get_aggregates()
 
-    if df.empty:
+    if not aggs.groups["Neighborhood Name"]:
         return {"error": "Dataset empty"}
 
     # =============================
     # 1. Neighborhood Comparison
     # =============================
 
-    neighborhood_stats = df.groupby("Neighborhood Name").agg(
-        AvgPrice=("House Sale Price", "mean"),
-        MedianPrice=("House Sale Price", "median"),
-        TotalSales=("House Sale Price", "count")
-    ).reset_index().sort_values(by="AvgPrice", ascending=False)
+    neighborhood_stats = aggs.summary("Neighborhood Name")
+    neighborhood_stats["MedianPrice"] = with_median(neighborhood_stats, dataset, "Neighborhood Name")
+    neighborhood_stats = neighborhood_stats.rename(columns={"Count": "TotalSales"})[
+        ["Neighborhood Name", "AvgPrice", "MedianPrice", "TotalSales"]
+    ].sort_values(by="AvgPrice", ascending=False)
 
     # =============================
     # 2. Zoning Impact
     # =============================
 
-    zoning_impact = df.groupby("Zoning Classification").agg(
-        AvgPrice=("House Sale Price", "mean"),
-        MedianPrice=("House Sale Price", "median"),
-        TotalSales=("House Sale Price", "count")
-    ).reset_index().sort_values(by="AvgPrice", ascending=False)
+    zoning_impact = aggs.summary("Zoning Classification")
+    zoning_impact["MedianPrice"] = with_median(zoning_impact, dataset, "Zoning Classification")
+    zoning_impact = zoning_impact.rename(columns={"Count": "TotalSales"})[
+        ["Zoning Classification", "AvgPrice", "MedianPrice", "TotalSales"]
+    ].sort_values(by="AvgPrice", ascending=False)
 
     # =============================
     # 3. Lot Frontage vs Price
     # =============================
 
-    lot_frontage = df[["Lot Frontage Length", "House Sale Price"]].dropna()
+    # The only row section: range filters, paging params and total-count headers apply to it
+    lot_frontage = paginate(
+        (chunk.dropna() for chunk in filtered_chunks(["Lot Frontage Length", "House Sale Price"], params.clauses())),
+        params.limit, params.cursor, params.field_list()
+    )
 
     # =============================
     # 4. Lot Area Impact
     # =============================
 
-    lot_area = df.groupby(
-        pd.cut(
-            df["Lot Area Square Feet"],
-            bins=[0, 5000, 10000, 20000, 50000, df["Lot Area Square Feet"].max()]
-        )
-    ).agg(
-        AvgPrice=("House Sale Price", "mean"),
-        Count=("House Sale Price", "count")
-    ).reset_index()
+    lot_area = aggs.summary("Lot Area Range")
 
-    lot_area["Lot Area Range"] = lot_area["Lot Area Square Feet"].astype(str)
+    labels = aggs.bin_labels("Lot Area Range")
+    lot_area["Lot Area Range"] = [labels[int(b)] for b in lot_area["Lot Area Range"]]
 
     # =============================
     # 5. Alley Access
     # =============================
 
-    alley_analysis = df.groupby("Alley Access").agg(
-        AvgPrice=("House Sale Price", "mean"),
-        Count=("House Sale Price", "count")
-    ).reset_index()
+    alley_analysis = aggs.summary("Alley Access")
 
-    alley_analysis["Alley Access"] = alley_analysis["Alley Access"].fillna("No Alley")
+    alley_analysis["Alley Access"] = alley_analysis["Alley Access"].astype(object).fillna("No Alley")
 
     # =============================
     # 6. Paved Drive Premium
     # =============================
 
-    paved_drive = df.groupby("Driveway Paving").agg(
-        AvgPrice=("House Sale Price", "mean"),
-        MedianPrice=("House Sale Price", "median"),
-        Count=("House Sale Price", "count")
-    ).reset_index()
+    paved_drive = aggs.summary("Driveway Paving")
+    paved_drive["MedianPrice"] = with_median(paved_drive, dataset, "Driveway Paving")
+    paved_drive = paved_drive[["Driveway Paving", "AvgPrice", "MedianPrice", "Count"]]
 
     # =============================
     # API RESPONSE
     # =============================
 
-    return {
-        "neighborhood_comparison": neighborhood_stats.to_dict(orient="records"),
-        "zoning_impact": zoning_impact.to_dict(orient="records"),
-        "lot_frontage_vs_price": lot_frontage.to_dict(orient="records"),
-        "lot_area_impact": lot_area[["Lot Area Range", "AvgPrice", "Count"]].to_dict(orient="records"),
-        "alley_access_analysis": alley_analysis.to_dict(orient="records"),
-        "paved_drive_premium": paved_drive.to_dict(orient="records")
-    }
+    return FastJSONResponse({
+        "neighborhood_comparison": encode_table(neighborhood_stats, params.format),
+        "zoning_impact": encode_table(zoning_impact, params.format),
+        "lot_frontage_vs_price": encode_table(lot_frontage.rows, params.format),
+        "lot_area_impact": encode_table(lot_area[["Lot Area Range", "AvgPrice", "Count"]], params.format),
+        "alley_access_analysis": encode_table(alley_analysis, params.format),
+        "paved_drive_premium": encode_table(paved_drive, params.format)
+    }, headers=lot_frontage.headers())
\ No newline at end of file
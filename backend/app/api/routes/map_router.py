@@ -1,19 +1,14 @@
-import os
-import pandas as pd
 import folium
 from folium.plugins import HeatMap, MarkerCluster
 from fastapi import APIRouter
 from fastapi.responses import HTMLResponse
+from app.api.response_cache import cache_policy
+from app.services.dataset_service import iter_chunks
+from app.services.result_cache import MB
+from app.services.stream_service import grouped_mean
 
 router = APIRouter()
 
-# ===========================
-# PATH
-# ===========================
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
-DATA_PATH = os.path.join(BASE_DIR, "data", "house_prices1.csv")
-
 # ===========================
 # NEIGHBORHOOD COORDS (Approx Ames)
 # ===========================
@@ -49,15 +44,6 @@ NEIGH_COORDS = {
     "Green Hills": [42.040, -93.690]
 }
 
-# ===========================
-# LOAD DATA
-# ===========================
-
-def load_data():
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError("CSV file not found")
-    return pd.read_csv(DATA_PATH)
-
 # ===========================
 # COLOR LOGIC
 # ===========================
@@ -75,12 +61,14 @@ def price_color(price):
 # ===========================
 
 @router.get("/map", response_class=HTMLResponse)
+@cache_policy(stale_ttl=600, max_bytes=4 * MB)   # folium render is the slowest route: never evicted by others
 def generate_map():
 
-    df = load_data()
-
-    # IMPORTANT FIX 👇
-    agg = df.groupby("Neighborhood Name").mean(numeric_only=True).reset_index()
+    agg = grouped_mean(
+        iter_chunks(["Neighborhood Name", "House Sale Price", "Above Ground Living Area"]),
+        "Neighborhood Name",
+        ["House Sale Price", "Above Ground Living Area"]
+    )
 
     base_map = folium.Map(location=[42.03, -93.62], zoom_start=12)
 
@@ -1,87 +1,87 @@
-from fastapi import APIRouter
 import pandas as pd
-import os
+from fastapi import APIRouter
+from app.api.responses import TableFormat, table
+from app.services import dataset_service
+from app.services.aggregate_service import get_aggregates
+from app.services.stream_service import describe, grouped_mean
 
 router = APIRouter()
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
-
-DATA_PATH = os.path.join(BASE_DIR, "data", "house_prices1.csv")
-
-def load_data():
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f"CSV file not found: {DATA_PATH}")
-
-    df = pd.read_csv(DATA_PATH)
-
+def column_names():
     # ── Aggressive column name cleaning ─────────────────────────────
     # 1. Strip whitespace
-    df.columns = df.columns.str.strip()
-    
     # 2. Convert to title case (Yearbuilt → YearBuilt)
-    df.columns = df.columns.str.title()
-    
-    # Debug: show what we actually have (comment out in production)
-    print("Loaded columns:", df.columns.tolist())
-    year_cols = [c for c in df.columns if "year" in c.lower()]
-    print("Year-related columns:", year_cols)
-    
-    return df
+    # Maps cleaned name -> name as stored, so chunks can be read by either
+    header = dataset_service.get_dataset().frame.columns
+    return {c.strip().title(): c for c in header}
+
+
+def load_chunks(*columns):
+    names = column_names()
+    stored = [names[c] for c in columns]
+    rename = dict(zip(stored, columns))
+
+    for chunk in dataset_service.iter_chunks(stored):
+        yield chunk.rename(columns=rename)
 
 
 @router.get("/price-trends/yearly")
-def yearly_price_trends():
-    df = load_data()
+def yearly_price_trends(format: TableFormat = "records"):
+    columns = column_names()
     
     year_col = "Construction Year"
-    if year_col not in df.columns:
-        year_candidates = [c for c in df.columns if "year" in c.lower() and "built" in c.lower()]
+    if year_col not in columns:
+        year_candidates = [c for c in columns if "year" in c.lower() and "built" in c.lower()]
         if year_candidates:
             year_col = year_candidates[0]
             print(f"Using fallback year column: {year_col}")
         else:
             return {"error": "No year built column found in dataset"}
     
+    aggs = get_aggregates()
+    if year_col in aggs.dimensions:
+        yearly = aggs.means(year_col)
+    else:
+        yearly = grouped_mean(load_chunks(year_col, "House Sale Price"), year_col, ["House Sale Price"])
+
     yearly = (
-        df.groupby(year_col)["House Sale Price"]
-        .mean()
-        .reset_index()
+        yearly
         .rename(columns={year_col: "Construction Year", "House Sale Price": "House Sale Price"})
     )
     
-    return yearly.to_dict(orient="records")
+    return table(yearly, format)
 
 
 @router.get("/price-trends/seasonal")
-def seasonal_patterns():
-    df = load_data()
+def seasonal_patterns(format: TableFormat = "records"):
     seasonal = (
-        df.groupby("Month Sold")["House Sale Price"]
-        .mean()
-        .reset_index()
+        get_aggregates().means("Month Sold")
         .rename(columns={"Month Sold": "Month Sold", "House Sale Price": "House Sale Price"})
     )
-    return seasonal.to_dict(orient="records")
+    return table(seasonal, format)
 
 
 @router.get("/price-trends/distribution")
-def price_distribution():
-    df = load_data()
-    stats = df["House Sale Price"].describe()
-    result = [
-        {"Metric": k, "Value": float(v)}
-        for k, v in stats.items()
-    ]
-    return result
+def price_distribution(format: TableFormat = "records"):
+    dataset = dataset_service.get_dataset()
+    if dataset.revision:
+        # Ingested sales live only in the cube; quartiles come from its sketch
+        stats = get_aggregates().describe()
+    elif dataset.streaming:
+        stats = describe(load_chunks("House Sale Price"), "House Sale Price")
+    else:
+        stats = dataset.frame["House Sale Price"].describe()
+    result = pd.DataFrame({
+        "Metric": list(stats.index),
+        "Value": stats.to_numpy(dtype=float)
+    })
+    return table(result, format)
 
 
 @router.get("/price-trends/segments")
-def market_segments():
-    df = load_data()
+def market_segments(format: TableFormat = "records"):
     segments = (
-        df.groupby("Overall Material Quality")["House Sale Price"]
-        .mean()
-        .reset_index()
+        get_aggregates().means("Overall Material Quality")
         .rename(columns={"Overall Material Quality": "Overall Material Quality", "House Sale Price": "House Sale Price"})
     )
-    return segments.to_dict(orient="records")
\ No newline at end of file
+    return table(segments, format)
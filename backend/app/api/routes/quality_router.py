@@ -1,46 +1,20 @@
+from typing import Optional
+
 from fastapi import APIRouter
-import pandas as pd
-import os
+from app.api.responses import TableFormat, table
+from app.services.dataset_service import get_dataset
+from app.services.query_service import aggregate
 
 router = APIRouter()
 
-# ============================
-# PATH SETUP
-# ============================
-
-BASE_DIR = os.path.dirname(
-    os.path.dirname(
-        os.path.dirname(
-            os.path.dirname(
-                os.path.dirname(__file__)
-            )
-        )
-    )
-)
-
-DATA_PATH = os.path.join(BASE_DIR, "data", "house_prices1.csv")
-
-
-# ============================
-# LOAD CSV
-# ============================
-
-def load_data():
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f"CSV file not found: {DATA_PATH}")
-
-    return pd.read_csv(DATA_PATH)
-
-
 # ============================
 # OVERALL QUALITY
 # ============================
 
 @router.get("/quality/overall")
-def overall_quality():
-    df = load_data()
-    data = df.groupby("Overall Material Quality")["House Sale Price"].mean().reset_index()
-    return data.to_dict(orient="records")
+def overall_quality(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Overall Material Quality", where=where)
+    return table(data, format)
 
 
 # ============================
@@ -48,11 +22,9 @@ def overall_quality():
 # ============================
 
 @router.get("/quality/condition")
-def overall_condition():
-    df = load_data()
-    data = df["Overall Condition Rating"].value_counts().reset_index()
-    data.columns = ["Overall Condition Rating", "Count"]
-    return data.to_dict(orient="records")
+def overall_condition(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Overall Condition Rating", metric="count", sort="desc", where=where)
+    return table(data, format)
 
 
 # ============================
@@ -60,11 +32,9 @@ def overall_condition():
 # ============================
 
 @router.get("/quality/exterior")
-def exterior_quality():
-    df = load_data()
-    data = df.groupby("Exterior Quality")["House Sale Price"].mean().reset_index()
-    data.columns = ["Category", "House Sale Price"]
-    return data.to_dict(orient="records")
+def exterior_quality(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Exterior Quality", where=where).rename(columns={"Exterior Quality": "Category"})
+    return table(data, format)
 
 
 # ============================
@@ -72,11 +42,9 @@ def exterior_quality():
 # ============================
 
 @router.get("/quality/kitchen")
-def kitchen_quality():
-    df = load_data()
-    data = df.groupby("Kitchen Quality")["House Sale Price"].mean().reset_index()
-    data.columns = ["Category", "House Sale Price"]
-    return data.to_dict(orient="records")
+def kitchen_quality(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Kitchen Quality", where=where).rename(columns={"Kitchen Quality": "Category"})
+    return table(data, format)
 
 
 # ============================
@@ -84,11 +52,9 @@ def kitchen_quality():
 # ============================
 
 @router.get("/quality/basement")
-def basement_quality():
-    df = load_data()
-    data = df.groupby("Basement Height Quality")["House Sale Price"].mean().reset_index()
-    data.columns = ["Category", "House Sale Price"]
-    return data.to_dict(orient="records")
+def basement_quality(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Basement Height Quality", where=where).rename(columns={"Basement Height Quality": "Category"})
+    return table(data, format)
 
 
 # ============================
@@ -96,15 +62,12 @@ def basement_quality():
 # ============================
 
 @router.get("/quality/fireplace")
-def fireplace_quality():
-    df = load_data()
-
-    if "Fireplace Quality" not in df.columns:
+def fireplace_quality(where: Optional[str] = None, format: TableFormat = "records"):
+    if "Fireplace Quality" not in get_dataset().frame.columns:
         return []
 
-    data = df.groupby("Fireplace Quality")["House Sale Price"].mean().reset_index()
-    data.columns = ["Category", "House Sale Price"]
-    return data.to_dict(orient="records")
+    data = aggregate("Fireplace Quality", where=where).rename(columns={"Fireplace Quality": "Category"})
+    return table(data, format)
 
 
 # ============================
@@ -112,10 +75,9 @@ def fireplace_quality():
 # ============================
 
 @router.get("/quality/masonry")
-def masonry_quality():
-    df = load_data()
-    data = df.groupby("Masonry Veneer Type")["House Sale Price"].mean().reset_index()
-    return data.to_dict(orient="records")
+def masonry_quality(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Masonry Veneer Type", where=where)
+    return table(data, format)
 
 
 # ============================
@@ -123,7 +85,6 @@ def masonry_quality():
 # ============================
 
 @router.get("/quality/exterior-condition")
-def exterior_condition():
-    df = load_data()
-    data = df.groupby("Exterior Condition")["House Sale Price"].mean().reset_index()
-    return data.to_dict(orient="records")
+def exterior_condition(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Exterior Condition", where=where)
+    return table(data, format)
@@ -0,0 +1,30 @@
+from typing import List
+
+from fastapi import APIRouter
+from app.schemas.schema import SaleRecord
+from app.services import aggregate_service, sales_service
+from app.services.dataset_service import dataset_version, get_dataset
+
+router = APIRouter()
+
+# ============================
+# INGEST
+# ============================
+
+def ingest(sales):
+    accepted = sales_service.append([sale.to_record() for sale in sales])
+
+    # Apply what is new in the log (ours plus other workers') to the live aggregates
+    aggregate_service.catch_up(get_dataset())
+
+    return {"accepted": accepted, "dataset_version": dataset_version()}
+
+
+@router.post("/sales", status_code=201)
+def add_sale(sale: SaleRecord):
+    return ingest([sale])
+
+
+@router.post("/sales/bulk", status_code=201)
+def add_sales(sales: List[SaleRecord]):
+    return ingest(sales)
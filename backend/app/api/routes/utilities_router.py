@@ -1,45 +1,21 @@
-from fastapi import APIRouter
-import pandas as pd
-import os
-
-router = APIRouter()
-
-# ============================
-# PATH SETUP
-# ============================
-
-BASE_DIR = os.path.dirname(
-    os.path.dirname(
-        os.path.dirname(
-            os.path.dirname(
-                os.path.dirname(__file__)
-            )
-        )
-    )
-)
-
-DATA_PATH = os.path.join(BASE_DIR, "data", "house_prices1.csv")
+from typing import Annotated, Optional
 
+from fastapi import APIRouter, Query
+from app.api.responses import TableFormat, table
+from app.schemas.schema import ScatterQuery
+from app.services.query_service import aggregate, filtered_chunks
+from app.services.sampling_service import scatter_page
 
-# ============================
-# LOAD CSV
-# ============================
-
-def load_data():
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f"CSV not found: {DATA_PATH}")
-    return pd.read_csv(DATA_PATH)
-
+router = APIRouter()
 
 # ============================
 # CENTRAL AIR
 # ============================
 
 @router.get("/utilities/central-air")
-def central_air():
-    df = load_data()
-    data = df.groupby("Central Air Conditioning")["House Sale Price"].mean().reset_index()
-    return data.to_dict(orient="records")
+def central_air(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Central Air Conditioning", where=where)
+    return table(data, format)
 
 
 # ============================
@@ -47,10 +23,9 @@ def central_air():
 # ============================
 
 @router.get("/utilities/heating-quality")
-def heating_quality():
-    df = load_data()
-    data = df.groupby("Heating Quality")["House Sale Price"].mean().reset_index()
-    return data.sort_values("House Sale Price", ascending=False).to_dict(orient="records")
+def heating_quality(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Heating Quality", sort="desc", where=where)
+    return table(data, format)
 
 
 # ============================
@@ -58,10 +33,9 @@ def heating_quality():
 # ============================
 
 @router.get("/utilities/electrical")
-def electrical():
-    df = load_data()
-    data = df.groupby("Electrical System")["House Sale Price"].mean().reset_index()
-    return data.sort_values("House Sale Price", ascending=False).to_dict(orient="records")
+def electrical(where: Optional[str] = None, format: TableFormat = "records"):
+    data = aggregate("Electrical System", sort="desc", where=where)
+    return table(data, format)
 
 
 # ============================
@@ -69,12 +43,16 @@ def electrical():
 # ============================
 
 @router.get("/utilities/garage-age")
-def garage_age():
-    df = load_data()
+def garage_age(params: Annotated[ScatterQuery, Query()]):
+    cols = ["Garage Construction Year", "House Sale Price", "Garage Capacity Cars"]
 
-    gdf = df.dropna(subset=["Garage Construction Year"])
+    page = scatter_page(
+        ("garage-age", params.clauses()),
+        (chunk.dropna(subset=["Garage Construction Year"]) for chunk in filtered_chunks(cols, params.clauses())),
+        params, x="Garage Construction Year"
+    )
 
-    return gdf[["Garage Construction Year", "House Sale Price", "Garage Capacity Cars"]].to_dict(orient="records")
+    return table(page.rows, params.format, headers=page.headers())
 
 
 # ============================
@@ -82,14 +60,13 @@ def garage_age():
 # ============================
 
 @router.get("/utilities/summary")
-def utilities_summary():
-    df = load_data()
-
+def utilities_summary(where: Optional[str] = None):
     cols = ["Heating Quality", "Electrical System", "Central Air Conditioning", "Driveway Paving"]
 
     summary = {}
 
     for col in cols:
-        summary[col] = df[col].value_counts().to_dict()
+        counts = aggregate(col, metric="count", sort="desc", where=where)
+        summary[col] = dict(zip(counts[col].tolist(), counts["Count"].tolist()))
 
     return summary
\ No newline at end of file
@@ -0,0 +1,83 @@
+from collections import defaultdict
+
+import anyio
+
+# ===========================
+# SINGLE-FLIGHT COALESCING
+# ===========================
+#
+# When the dashboard opens, several sessions ask for the same uncached
+# result at once. The first request for a key runs the computation; every
+# identical request that arrives while it runs waits for that run and
+# shares its outcome (result or exception) instead of starting its own.
+# Keys are the response cache keys (path, query, representation, dataset
+# version), so only truly identical requests are coalesced.
+#
+# State lives on the worker's event loop; no locks are needed. Metrics
+# are per route and per worker process.
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "abandoned", "waiters")
+
+    def __init__(self):
+        self.done = anyio.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False      # leader was cancelled: waiters run it themselves
+        self.waiters = 0
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self.flights = {}
+        self.metrics = defaultdict(lambda: {"requests": 0, "computed": 0, "coalesced": 0, "peak_waiters": 0})
+
+    async def do(self, key, route, compute):
+        """``await compute()`` once for all concurrent callers with the same ``key``.
+
+        Returns ``(result, coalesced)``; ``coalesced`` is True for callers
+        that shared another request's run.
+        """
+        stats = self.metrics[route]
+        stats["requests"] += 1
+
+        while True:
+            flight = self.flights.get(key)
+            if flight is None:
+                break
+
+            flight.waiters += 1
+            stats["peak_waiters"] = max(stats["peak_waiters"], flight.waiters)
+            await flight.done.wait()
+            if flight.abandoned:
+                continue
+            stats["coalesced"] += 1
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        flight = self.flights[key] = _Flight()
+        stats["computed"] += 1
+        try:
+            flight.result = await compute()
+            return flight.result, False
+        except anyio.get_cancelled_exc_class():
+            flight.abandoned = True
+            raise
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            del self.flights[key]
+            flight.done.set()
+
+    def stats(self):
+        return {
+            "in_flight": len(self.flights),
+            "routes": {route: dict(stats) for route, stats in sorted(self.metrics.items())},
+        }
+
+
+flights = SingleFlight()
@@ -1,7 +1,39 @@
-from fastapi import FastAPI
-from app.api.routes import predict, health, location_router, feature_routes, quality_router, utilities_router, price_trends_router, map_router
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request
+from app.api.response_cache import ResponseCacheMiddleware
+from app.api.responses import FastJSONResponse, negotiate
+from app.api.routes import predict, health, location_router, feature_routes, quality_router, utilities_router, price_trends_router, map_router, sales_router, aggregate_router, cache_router
+from app.services import dataset_service
+from app.services.query_service import QueryError
+
+
+@asynccontextmanager
+async def lifespan(app):
+    dataset_service.get_dataset()
+    # A worker forked from a preloading master inherits the master's dataset
+    # as it was at preload; catch up with drops and sales before serving
+    dataset_service.refresh()
+    dataset_service.start_watcher()
+    yield
+    dataset_service.stop_watcher()
+
+
+app = FastAPI(
+    title="House Price Prediction API",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+    dependencies=[Depends(negotiate)],
+)
+
+app.add_middleware(ResponseCacheMiddleware)
+
+
+@app.exception_handler(QueryError)
+async def query_error(request: Request, exc: QueryError):
+    # Bad by/metric/where parameters on any aggregation route
+    return FastJSONResponse(status_code=400, content={"detail": str(exc)})
 
-app = FastAPI(title="House Price Prediction API")
 
 app.include_router(predict.router, prefix="/api")
 app.include_router(health.router, prefix="/api")
@@ -11,6 +43,9 @@ app.include_router(feature_routes.router, prefix="/api")
 app.include_router(quality_router.router, prefix="/api")
 app.include_router(utilities_router.router, prefix="/api")
 app.include_router(map_router.router, prefix="/api")
+app.include_router(sales_router.router, prefix="/api")
+app.include_router(aggregate_router.router, prefix="/api")
+app.include_router(cache_router.router, prefix="/api")
 
 @app.get("/")
 def root():
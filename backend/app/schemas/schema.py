@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Literal, Optional
+
+from app.services.dtype_plan import CATEGORICAL_COLUMNS, NUMERIC_DTYPES
 
 
 class HouseFeatures(BaseModel):
@@ -84,4 +86,88 @@ class HouseFeatures(BaseModel):
     MoSold: int
     YrSold: int
     SaleType: str
-    SaleCondition: str
\ No newline at end of file
+    SaleCondition: str
+
+
+class SaleRecord(BaseModel):
+    """One new sale, keyed by the dataset's own column names."""
+
+    model_config = ConfigDict(extra="allow", populate_by_name=True)
+
+    SalePrice: float = Field(alias="House Sale Price", gt=0)
+
+    @model_validator(mode="after")
+    def check_columns(self):
+        for column, value in (self.model_extra or {}).items():
+            if column in CATEGORICAL_COLUMNS:
+                if value is not None and not isinstance(value, str):
+                    raise ValueError(f"'{column}' must be a string")
+            elif column in NUMERIC_DTYPES:
+                if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                    raise ValueError(f"'{column}' must be a number")
+            else:
+                raise ValueError(f"Unknown column '{column}'")
+        return self
+
+    def to_record(self):
+        return {"House Sale Price": self.SalePrice, **(self.model_extra or {})}
+
+
+
+class PageParams(BaseModel):
+    """Keyset page, column projection and table format for the row-returning endpoints."""
+
+    limit: Optional[int] = Field(default=None, ge=1, le=10000)
+    cursor: Optional[int] = Field(default=None, ge=-1)
+    fields: Optional[str] = None
+    format: Literal["records", "columns"] = "records"
+
+    def field_list(self):
+        return [f.strip() for f in self.fields.split(",") if f.strip()] if self.fields else None
+
+
+class RangeFilter(BaseModel):
+    """Optional server-side range filters for the row-returning endpoints."""
+
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    area_min: Optional[float] = None
+    area_max: Optional[float] = None
+    lot_min: Optional[float] = None
+    lot_max: Optional[float] = None
+    built_from: Optional[int] = None
+    built_to: Optional[int] = None
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+
+    def clauses(self):
+        """Inclusive ``(column, op, (value,))`` clauses for the set bounds."""
+        bounds = [
+            ("House Sale Price", self.price_min, self.price_max),
+            ("Above Ground Living Area", self.area_min, self.area_max),
+            ("Lot Area Square Feet", self.lot_min, self.lot_max),
+            ("Construction Year", self.built_from, self.built_to),
+            ("Year Sold", self.year_from, self.year_to),
+        ]
+        clauses = []
+        for column, low, high in bounds:
+            if low is not None:
+                clauses.append((column, ">=", (float(low),)))
+            if high is not None:
+                clauses.append((column, "<=", (float(high),)))
+        return tuple(sorted(clauses, key=str))
+
+
+class SampleParams(BaseModel):
+    """Server-side downsampling for the scatter endpoints (see sampling_service)."""
+
+    max_points: Optional[int] = Field(default=None, ge=10, le=100000)
+    sample: Literal["lttb", "stratified", "density"] = "lttb"
+
+
+class RowQuery(RangeFilter, PageParams):
+    """Range filters plus paging, as the row-returning endpoints accept them."""
+
+
+class ScatterQuery(RowQuery, SampleParams):
+    """Row query for the scatter endpoints, which can also be downsampled."""
@@ -0,0 +1,336 @@
+import math
+import operator
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.services import dataset_service, dtype_plan, sales_service
+from app.services.quantile_sketch import QuantileSketch
+
+PRICE = "House Sale Price"
+
+# Comparison operators usable in a ``(column, op, value)`` filter clause
+OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+# ===========================
+# DIMENSIONS
+# ===========================
+
+class Dimension:
+    """A way of bucketing sales: a column, optionally filtered or binned."""
+
+    def __init__(self, column, name=None, where=None, bins=None):
+        self.column = column
+        self.name = name or column
+        self.where = where          # (column, op, value) clause applied per row
+        self.bins = bins            # left edges; the last bin is open-ended
+
+    def keys(self, frame):
+        """Vectorised group keys for ``frame`` (NaN rows are dropped by groupby)."""
+        values = frame[self.column]
+
+        if self.bins is not None:
+            edges = list(self.bins) + [np.inf]
+            values = pd.cut(values, bins=edges, labels=False)
+
+        if self.where is not None:
+            column, op, operand = self.where
+            values = values.where(OPERATORS[op](frame[column], operand))
+
+        return values
+
+
+LOT_AREA_BINS = [0, 5000, 10000, 20000, 50000]
+
+# Numeric columns with few distinct values that dashboards group by
+ORDINAL_COLUMNS = (
+    "Building Class", "Overall Material Quality", "Overall Condition Rating",
+    "Construction Year", "Remodel Year", "Basement Full Bathrooms",
+    "Basement Half Bathrooms", "Full Bathrooms", "Half Bathrooms",
+    "Bedrooms Above Ground", "Kitchens Above Ground", "Total Rooms Above Ground",
+    "Number of Fireplaces", "Garage Construction Year", "Garage Capacity Cars",
+    "Month Sold", "Year Sold",
+)
+
+# Every categorical and ordinal column, plus the derived groupings endpoints use
+DIMENSIONS = (
+    [Dimension(column) for column in dtype_plan.CATEGORICAL_COLUMNS]
+    + [Dimension(column) for column in ORDINAL_COLUMNS]
+    + [
+        Dimension("Pool Quality", name="Pool Quality (with pool)", where=("Pool Area", ">", 0)),
+        Dimension("Lot Area Square Feet", name="Lot Area Range", bins=LOT_AREA_BINS),
+    ]
+)
+
+
+# ===========================
+# PRICE CUBE
+# ===========================
+
+class GroupStats:
+    """count, sum, sum of squares, min, max and a quantile sketch of price for one group."""
+
+    __slots__ = ("count", "total", "total_sq", "low", "high", "sketch")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.low = np.inf
+        self.high = -np.inf
+        self.sketch = QuantileSketch()
+
+    def merge(self, count, total, total_sq, low, high, values):
+        self.count += count
+        self.total += total
+        self.total_sq += total_sq
+        self.low = min(self.low, low)
+        self.high = max(self.high, high)
+        self.sketch.update(values)
+
+    @property
+    def mean(self):
+        return self.total / self.count
+
+    @property
+    def std(self):
+        # Sample standard deviation, as pandas reports it
+        if self.count < 2:
+            return None
+        variance = (self.total_sq - self.count * self.mean ** 2) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+class SalesBuffer:
+    """Applied sales held column by column, appended one batch at a time.
+
+    ``frame()`` concatenates the batches once per revision, so scans
+    select their columns from one frame instead of rebuilding rows from
+    record dicts on every query.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.rows = 0
+        self._frame = None
+        self.lock = threading.Lock()
+
+    def append(self, records, header):
+        """Add ``records`` typed like ``header`` (numeric columns as numbers); returns the batch."""
+        batch = pd.DataFrame.from_records(records)
+        for column in batch.columns:
+            if column in header.columns and pd.api.types.is_numeric_dtype(header[column].dtype):
+                values = pd.to_numeric(batch[column], errors="coerce").astype(np.float64)
+                if pd.api.types.is_integer_dtype(header[column].dtype) and not values.isna().any():
+                    values = values.astype(np.int64)
+                batch[column] = values
+
+        with self.lock:
+            self.batches.append(batch)
+            self.rows += len(batch)
+            self._frame = None
+        return batch
+
+    def frame(self, columns):
+        """Every applied sale as a frame of ``columns`` (all-NaN where no sale had one)."""
+        with self.lock:
+            if self._frame is None:
+                self._frame = pd.concat(self.batches, ignore_index=True) if self.batches else pd.DataFrame()
+                self.batches = [self._frame]
+            frame = self._frame
+        return frame.reindex(columns=list(columns))
+
+
+class RunningAggregates:
+    """Materialised price cube: GroupStats for every group of every dimension.
+
+    Built once per dataset version by folding frames (the whole frame, or
+    one chunk at a time in streaming mode), then kept current by folding
+    each batch of new sales from the sales log the same way. Handlers read
+    it in O(groups) and never scan rows.
+    """
+
+    def __init__(self, dimensions):
+        self.dimensions = {d.name: d for d in dimensions}
+        self.groups = {d.name: {} for d in dimensions}
+        self.overall = GroupStats()     # every priced row, whatever its groups
+        self.maxima = {}
+        self.integral = set()       # columns the file stores as integers
+        self.sales = SalesBuffer()  # applied sales, for scans that must see them
+        self.applied = 0
+        self.log_offset = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_chunks(cls, chunks, dimensions=DIMENSIONS):
+        aggs = cls(dimensions)
+        for chunk in chunks:
+            aggs.fold(chunk)
+        return aggs
+
+    def fold(self, frame):
+        """Merge the partial aggregates of ``frame`` (vectorised per dimension)."""
+        prices = frame[PRICE].to_numpy(dtype=np.float64)
+        priced = prices[~np.isnan(prices)]
+        if len(priced):
+            self.overall.merge(
+                len(priced), float(priced.sum()), float(np.square(priced).sum()),
+                float(priced.min()), float(priced.max()), priced,
+            )
+
+        for d in self.dimensions.values():
+            if d.column not in frame.columns or (d.where and d.where[0] not in frame.columns):
+                continue
+
+            if pd.api.types.is_integer_dtype(frame[d.column].dtype):
+                self.integral.add(d.column)
+            codes, uniques = pd.factorize(d.keys(frame))
+            valid = (codes >= 0) & ~np.isnan(prices)
+            codes, values = codes[valid], prices[valid]
+            n = len(uniques)
+
+            count = np.bincount(codes, minlength=n)
+            total = np.bincount(codes, weights=values, minlength=n)
+            total_sq = np.bincount(codes, weights=values * values, minlength=n)
+            low = np.full(n, np.inf)
+            high = np.full(n, -np.inf)
+            np.minimum.at(low, codes, values)
+            np.maximum.at(high, codes, values)
+            # Each group's prices as one contiguous slice, for its sketch
+            ordered = values[np.argsort(codes, kind="stable")]
+            ends = np.cumsum(count)
+
+            groups = self.groups[d.name]
+            for i, key in enumerate(uniques):
+                if count[i] == 0:
+                    continue
+                key = dtype_plan.native(key)
+                if isinstance(key, float) and (d.bins is not None or d.column in self.integral):
+                    key = int(key)      # a sales batch with gaps holds integers as float
+                stats = groups.get(key)
+                if stats is None:
+                    stats = groups[key] = GroupStats()
+                stats.merge(
+                    int(count[i]), float(total[i]), float(total_sq[i]), float(low[i]), float(high[i]),
+                    ordered[ends[i] - count[i]:ends[i]],
+                )
+
+            if d.bins is not None:
+                column_max = frame[d.column].max()
+                if not pd.isna(column_max):
+                    self.maxima[d.column] = max(self.maxima.get(d.column, column_max), dtype_plan.native(column_max))
+
+    # ---------- views ----------
+
+    def _items(self, name):
+        with self.lock:
+            return sorted(self.groups[name].items(), key=lambda item: item[0])
+
+    def means(self, name, label=None, value=PRICE):
+        """Like ``df.groupby(col)[price].mean().reset_index()``."""
+        items = self._items(name)
+        return pd.DataFrame({
+            label or name: [key for key, _ in items],
+            value: [stats.mean for _, stats in items],
+        })
+
+    def summary(self, name, label=None):
+        """Key, AvgPrice and Count per group, in key order."""
+        items = self._items(name)
+        return pd.DataFrame({
+            label or name: [key for key, _ in items],
+            "AvgPrice": [stats.mean for _, stats in items],
+            "Count": [stats.count for _, stats in items],
+        })
+
+    def stats(self, name, label=None):
+        """Every stored moment per group, in key order."""
+        items = self._items(name)
+        return pd.DataFrame({
+            label or name: [key for key, _ in items],
+            "Count": [stats.count for _, stats in items],
+            "Sum": [stats.total for _, stats in items],
+            "SumSquares": [stats.total_sq for _, stats in items],
+            "Min": [stats.low for _, stats in items],
+            "Max": [stats.high for _, stats in items],
+            "Mean": [stats.mean for _, stats in items],
+            "Std": [stats.std for _, stats in items],
+        })
+
+    def describe(self):
+        """Like ``df[price].describe()`` over every row; quartiles from the sketch."""
+        with self.lock:
+            stats = self.overall
+            quartiles = stats.sketch.quantiles((0.25, 0.5, 0.75))
+            return pd.Series({
+                "count": float(stats.count),
+                "mean": stats.mean if stats.count else np.nan,
+                "std": np.nan if stats.std is None else stats.std,
+                "min": stats.low,
+                "25%": quartiles[0],
+                "50%": quartiles[1],
+                "75%": quartiles[2],
+                "max": stats.high,
+            })
+
+    def quantiles(self, name, q):
+        """Per-group price quantile ``q`` from the sketches (see quantile_sketch)."""
+        return {key: stats.sketch.quantile(q) for key, stats in self._items(name)}
+
+    def medians(self, name):
+        return self.quantiles(name, 0.5)
+
+    def bin_labels(self, name):
+        d = self.dimensions[name]
+        edges = list(d.bins) + [self.maxima.get(d.column)]
+        return [f"({_fmt(lo)}, {_fmt(hi)}]" for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+def _fmt(value):
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+# ===========================
+# DATASET WIRING
+# ===========================
+
+def _apply_log(dataset, aggs):
+    with aggs.lock:
+        records, offset = sales_service.read_from(aggs.log_offset)
+        if records:
+            aggs.fold(aggs.sales.append(records, dataset.frame))
+            aggs.applied += len(records)
+        aggs.log_offset = offset
+        dataset.revision = aggs.applied
+
+    return len(records)
+
+
+def catch_up(dataset):
+    """Apply sales appended to the log since ``dataset``'s aggregates last looked."""
+    return _apply_log(dataset, dataset.derived("price_aggregates"))
+
+
+def _build(dataset):
+    aggs = RunningAggregates.from_chunks(dataset.chunks())
+    # Replay the logged sales the file does not already include
+    aggs.log_offset = sales_service.start_offset(dataset.version, dataset.signature[0] / 1e9,
+                                                 drop=dataset.replaces not in (None, dataset.version))
+    _apply_log(dataset, aggs)
+    return aggs
+
+
+def get_aggregates():
+    return dataset_service.get_dataset().derived("price_aggregates")
+
+
+dataset_service.register_derived("price_aggregates", _build)
+dataset_service.register_refresh(catch_up)
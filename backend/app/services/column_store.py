@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from app.services import dtype_plan, shared_arena
+
+try:
+    import fcntl
+except ImportError:         # optional: without flock concurrent builders are not serialised
+    fcntl = None
+
+# ===========================
+# BINARY COLUMN SIDECAR
+# ===========================
+#
+# data/house_prices1.csv  ->  data/.house_prices1.columns/
+#     manifest.json                 source mtime/size/hash + column dtypes
+#     <hash>-<stamp>/c000.npy ...   one array per numeric column (dtype_plan width)
+#     <hash>-<stamp>/c001.codes.npy categorical columns as small int codes ...
+#     <hash>-<stamp>/c001.labels.npy ... plus their sorted unicode dictionary
+#     .lock                         flock serialising builds
+#
+# The sidecar is rebuilt only when the source mtime/size changes AND the
+# content hash no longer matches the one recorded in the manifest.
+#
+# Numeric columns are opened with mmap_mode="r", so the frame handed to the
+# routers is backed by the OS page cache: every worker on the node shares
+# the same physical pages and startup only touches what is actually read.
+#
+# Several workers may find the sidecar stale at once. Check-and-build runs
+# under an flock on the sidecar root, and whoever gets the lock second
+# re-reads the manifest and uses the first one's build. Every build is
+# published under a fresh directory name and switched to by rewriting the
+# manifest, so a directory other processes may be mapping is never
+# replaced in place. Superseded directories are kept for RETIRE_SECONDS
+# (long enough for any reader of the old manifest to have mapped its
+# files) before they are deleted.
+
+MANIFEST = "manifest.json"
+LOCK = ".lock"
+FORMAT_VERSION = 2
+RETIRE_SECONDS = 600
+
+
+def sidecar_dir(source_path):
+    folder, name = os.path.split(source_path)
+    return os.path.join(folder, "." + os.path.splitext(name)[0] + ".columns")
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("format") != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+@contextmanager
+def _locked(cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(cache_dir, LOCK), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_manifest(cache_dir, manifest):
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(cache_dir, MANIFEST))
+
+
+# ===========================
+# BUILD
+# ===========================
+
+def build(source_path, frame=None, source_hash=None):
+    """Write the sidecar for ``source_path`` and return its manifest.
+
+    Callers hold ``_locked(sidecar_dir(source_path))``.
+    """
+    cache_dir = sidecar_dir(source_path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    stat = os.stat(source_path)
+    if source_hash is None:
+        source_hash = file_hash(source_path)
+    if frame is None:
+        frame = pd.read_csv(source_path)
+
+    columns = []
+    profile = dtype_plan.parsed_profile(frame)
+    work_dir = tempfile.mkdtemp(dir=cache_dir, prefix=f".build-{os.getpid()}-")
+
+    for i, name in enumerate(frame.columns):
+        series = frame[name]
+        stem = f"c{i:03d}"
+        entry = {"name": name, "file": stem, "parsed": profile[name]}
+
+        if name in dtype_plan.CATEGORICAL_COLUMNS or dtype_plan.is_text(series):
+            codes, labels = dtype_plan.encode_categorical(series)
+            np.save(os.path.join(work_dir, stem + ".codes.npy"), codes)
+            np.save(os.path.join(work_dir, stem + ".labels.npy"), labels)
+            entry.update(kind="category", dtype=codes.dtype.str)
+        else:
+            values = dtype_plan.compact_numeric(name, series.to_numpy())
+            np.save(os.path.join(work_dir, stem + ".npy"), values)
+            entry.update(kind="numeric", dtype=values.dtype.str)
+
+        columns.append(entry)
+
+    # A fresh name: an older build of the same content may still be mapped
+    data_dir = os.path.join(cache_dir, f"{source_hash[:12]}-{time.time_ns():x}")
+    os.rename(work_dir, data_dir)
+
+    previous = _read_manifest(cache_dir)
+    retired = dict(previous.get("retired", {})) if previous else {}
+    if previous and previous["data_dir"] != os.path.basename(data_dir):
+        retired[previous["data_dir"]] = time.time()
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "source": os.path.basename(source_path),
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_size": stat.st_size,
+        "source_hash": source_hash,
+        "data_dir": os.path.basename(data_dir),
+        "rows": int(len(frame)),
+        "columns": columns,
+        "retired": retired,
+    }
+    _prune(cache_dir, manifest)
+    _write_manifest(cache_dir, manifest)
+
+    return manifest
+
+
+def _prune(cache_dir, manifest):
+    """Drop crashed builds and directories retired more than RETIRE_SECONDS ago."""
+    now = time.time()
+    for name, retired_at in list(manifest["retired"].items()):
+        if now - retired_at >= RETIRE_SECONDS:
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+            del manifest["retired"][name]
+
+    for name in os.listdir(cache_dir):
+        if not name.startswith(".build-"):
+            continue
+        owner = name.split("-")[1]
+        if owner.isdigit() and int(owner) != os.getpid() and not shared_arena.pid_alive(int(owner)):
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+
+# ===========================
+# VALIDATE
+# ===========================
+
+def current_manifest(source_path, locked=False):
+    """Return a manifest matching ``source_path``, or None if the sidecar is stale.
+
+    Pass ``locked=True`` when the caller already holds the sidecar lock.
+    """
+    cache_dir = sidecar_dir(source_path)
+    manifest = _read_manifest(cache_dir)
+    if manifest is None:
+        return None
+
+    stat = os.stat(source_path)
+    if (manifest["source_mtime_ns"] == stat.st_mtime_ns
+            and manifest["source_size"] == stat.st_size):
+        return manifest
+
+    # Touched but maybe not changed: fall back to the content hash
+    if manifest["source_hash"] != file_hash(source_path):
+        return None
+
+    try:
+        if locked:
+            _restamp(cache_dir, manifest, stat)
+        else:
+            with _locked(cache_dir):
+                _restamp(cache_dir, manifest, stat)
+    except OSError:
+        pass
+    return manifest
+
+
+def _restamp(cache_dir, manifest, stat):
+    # Record the new mtime/size so the next check skips the hash; the caller holds the lock
+    latest = _read_manifest(cache_dir)
+    if latest is not None and latest["data_dir"] == manifest["data_dir"]:
+        latest["source_mtime_ns"] = stat.st_mtime_ns
+        latest["source_size"] = stat.st_size
+        _write_manifest(cache_dir, latest)
+
+
+# ===========================
+# READ
+# ===========================
+
+def read_column(source_path, manifest, entry, mmap=True):
+    data_dir = os.path.join(sidecar_dir(source_path), manifest["data_dir"])
+    stem = os.path.join(data_dir, entry["file"])
+
+    if entry["kind"] == "category":
+        codes = np.load(stem + ".codes.npy", mmap_mode="r" if mmap else None)
+        labels = np.load(stem + ".labels.npy")
+        values = pd.Categorical.from_codes(codes, categories=labels)
+        return pd.Series(values, name=entry["name"], copy=False)
+
+    values = np.load(stem + ".npy", mmap_mode="r" if mmap else None)
+    values = values.astype(np.dtype(entry["dtype"]), copy=False)
+    return pd.Series(values, name=entry["name"], copy=False)
+
+
+def read_frame(source_path, manifest, mmap=True):
+    # copy=False keeps each memory-mapped column as its own block
+    return pd.DataFrame({
+        entry["name"]: read_column(source_path, manifest, entry, mmap=mmap)
+        for entry in manifest["columns"]
+    }, copy=False)
+
+
+def _profile(manifest):
+    return {entry["name"]: entry["parsed"] for entry in manifest["columns"]}
+
+
+def load(source_path, mmap=True):
+    """Read ``source_path`` through its sidecar, building it when stale.
+
+    Returns ``(frame, source_hash, parsed_profile)``; the profile records the
+    dtype and size each column had as parsed from the CSV.
+    """
+    manifest = current_manifest(source_path)
+    if manifest is not None:
+        return read_frame(source_path, manifest, mmap=mmap), manifest["source_hash"], _profile(manifest)
+
+    try:
+        with _locked(sidecar_dir(source_path)):
+            # Another process may have built it while we waited for the lock
+            manifest = current_manifest(source_path, locked=True)
+            if manifest is None:
+                source_hash = file_hash(source_path)
+                frame = pd.read_csv(source_path)
+                manifest = build(source_path, frame=frame, source_hash=source_hash)
+    except OSError as e:
+        print(f"Warning: could not write column sidecar for {source_path}: {e}")
+        frame = pd.read_csv(source_path)
+        return dtype_plan.compact_frame(frame), file_hash(source_path), dtype_plan.parsed_profile(frame)
+
+    # Re-open from the sidecar so this process maps the shared files too
+    return read_frame(source_path, manifest, mmap=mmap), manifest["source_hash"], _profile(manifest)
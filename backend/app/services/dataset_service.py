@@ -0,0 +1,299 @@
+import os
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from app.services import column_store, dtype_plan, shared_arena, stream_service
+
+# ===========================
+# PATH
+# ===========================
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+DATA_PATH = os.path.join(BASE_DIR, "data", "house_prices1.csv")
+
+# Seconds between checks of DATA_PATH for a new drop; 0 disables the watcher
+RELOAD_INTERVAL = float(os.environ.get("DATASET_RELOAD_INTERVAL", "5"))
+
+# Seconds a changed DATA_PATH must go unmodified before it is loaded
+SETTLE_SECONDS = float(os.environ.get("DATASET_SETTLE_SECONDS", str(max(RELOAD_INTERVAL, 1.0))))
+
+# "memory" keeps the (memory-mapped) frame; "stream" never materialises it
+# and feeds every computation fixed-size chunks read from the CSV instead
+MODE = os.environ.get("DATASET_MODE", "memory")
+
+
+# ===========================
+# DATASET
+# ===========================
+
+def _is_mapped(series):
+    # Categoricals store codes; to_numpy() would build a fresh label array
+    values = series.array.codes if isinstance(series.dtype, pd.CategoricalDtype) else series.to_numpy(copy=False)
+    # pandas hands back views; walk down to see if a memmap owns the buffer
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = getattr(values, "base", None)
+    return False
+
+
+class Dataset:
+    """One parsed copy of the sales CSV, shared by every router."""
+
+    def __init__(self, frame, version, source_path, load_seconds, parsed_profile=None, signature=None,
+                 streaming=False):
+        self.frame = frame          # header-only when streaming
+        self.streaming = streaming
+        self.parsed_profile = parsed_profile or {}
+        self.version = version
+        self.source_path = source_path
+        self.signature = signature
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.generation = 0
+        self.revision = 0           # sales applied on top of the source file
+        self.replaces = None        # version this one replaced in a hot reload
+        self.arena = None           # shared_arena.Arena when derived arrays are shared
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+
+    def derived(self, name):
+        """Structure built from this frame by a registered builder (cube, index, ...).
+
+        None when the builder declines this dataset (e.g. an index in streaming mode).
+        """
+        if name not in self._derived:
+            with self._derived_lock:
+                if name not in self._derived:
+                    self._derived[name] = _DERIVED[name](self)
+        return self._derived[name]
+
+    def build_derived(self):
+        for name in list(_DERIVED):
+            self.derived(name)
+
+    def shared(self, name, build):
+        """``build()``'s ``[(key, array), ...]``, mapped from the shared arena when there is one."""
+        if self.arena is None:
+            return build()
+        return self.arena.share(name, build)
+
+    def chunks(self, columns=None, chunk_rows=None):
+        """Yield the data as frames: one for an in-memory dataset, many when streaming."""
+        if self.streaming:
+            yield from stream_service.iter_chunks(self.source_path, columns, chunk_rows)
+        else:
+            yield self.frame if columns is None else self.frame[list(columns)]
+
+    def materialize(self, columns=None):
+        if not self.streaming:
+            return self.frame.copy(deep=False) if columns is None else self.frame[list(columns)]
+        return stream_service.collect(self.chunks(columns), dropna=False)
+
+    def column(self, name):
+        # Read-only view: handlers can compute on it but never write back
+        values = self.materialize([name])[name].to_numpy(copy=False).view()
+        values.flags.writeable = False
+        return values
+
+    def mapped_columns(self):
+        return sum(_is_mapped(self.frame[name]) for name in self.frame.columns)
+
+    def memory_report(self):
+        return dtype_plan.memory_report(self.parsed_profile, self.frame)
+
+    def info(self):
+        return {
+            "version": self.version,
+            "source": self.source_path,
+            "mode": "stream" if self.streaming else "memory",
+            "rows": None if self.streaming else int(len(self.frame)),
+            "columns": int(len(self.frame.columns)),
+            "memory_mapped_columns": self.mapped_columns(),
+            "generation": self.generation,
+            "revision": self.revision,
+            "derived": sorted(name for name, value in self._derived.items() if value is not None),
+            "shared_arena": self.arena.path if self.arena is not None else None,
+            "shared_arena_bytes": self.arena.nbytes() if self.arena is not None else None,
+            "load_seconds": round(self.load_seconds, 4),
+            "loaded_at": self.loaded_at,
+        }
+
+
+_lock = threading.Lock()
+_dataset = None
+_DERIVED = {}
+_REFRESH = []
+
+
+def register_derived(name, builder):
+    """Register ``builder(dataset)``; it is rebuilt for every new dataset before the swap."""
+    _DERIVED[name] = builder
+
+
+def register_refresh(hook):
+    """Register ``hook(dataset)``, run after each load and on every watcher tick."""
+    _REFRESH.append(hook)
+
+
+def _refresh(dataset):
+    for hook in _REFRESH:
+        hook(dataset)
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load(path, replaces=None):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"CSV file not found: {path}")
+
+    start = time.perf_counter()
+    signature = _signature(path)
+
+    if MODE == "stream":
+        # Empty frame that still carries the column dtypes inferred from a sample
+        header = pd.read_csv(path, nrows=1000).iloc[:0]
+        source_hash = column_store.file_hash(path)
+        dataset = Dataset(header, source_hash[:12], path, time.perf_counter() - start, None, signature,
+                          streaming=True)
+    else:
+        frame, source_hash, profile = column_store.load(path)
+        dataset = Dataset(frame, source_hash[:12], path, time.perf_counter() - start, profile, signature)
+
+    if shared_arena.enabled():
+        # Released when the dataset is dropped after a reload (or at exit)
+        dataset.arena = shared_arena.Arena(dataset.version)
+        weakref.finalize(dataset, dataset.arena.release)
+
+    dataset.replaces = replaces
+    dataset.build_derived()
+    _refresh(dataset)
+    return dataset
+
+
+def get_dataset():
+    global _dataset
+
+    if _dataset is None:
+        with _lock:
+            if _dataset is None:
+                _dataset = _load(DATA_PATH)
+
+    return _dataset
+
+
+# ===========================
+# HOT RELOAD
+# ===========================
+#
+# Requests grab ``get_dataset()`` once and keep that object to the end, so
+# a swap never affects work in flight. The replacement (frame plus every
+# registered derived structure) is built entirely on the watcher thread;
+# publishing it is a single reference assignment.
+#
+# Drops should replace DATA_PATH atomically: write a temporary file in the
+# same directory and rename it over the old one. A file written in place
+# is picked up only once its mtime is SETTLE_SECONDS old (by default one
+# watcher tick with no change in between), so a half-written CSV is never
+# loaded as a version of its own.
+
+_watcher = None
+_watcher_stop = threading.Event()
+
+
+def reload(force=False):
+    """Load DATA_PATH again and swap it in if it changed. Returns True on swap."""
+    global _dataset
+
+    current = get_dataset()
+    signature = _signature(DATA_PATH)
+    if not force and signature == current.signature:
+        return False
+
+    if not force and time.time() - signature[0] / 1e9 < SETTLE_SECONDS:
+        # Possibly still being written; look again next tick
+        return False
+
+    if not force and column_store.file_hash(DATA_PATH)[:12] == current.version:
+        # Touched, same content: keep the warm dataset, just note the new stamp
+        current.signature = signature
+        return False
+
+    fresh = _load(DATA_PATH, replaces=current.version)
+
+    fresh.generation = current.generation + 1
+    with _lock:
+        _dataset = fresh
+    print(f"Dataset reloaded: {current.version} -> {fresh.version}")
+    return True
+
+
+def refresh():
+    """Pick up a settled drop and logged sales: one watcher tick, run now."""
+    reload()
+    _refresh(get_dataset())
+
+
+def _watch(interval):
+    while not _watcher_stop.wait(interval):
+        try:
+            refresh()
+        except Exception as e:
+            # Keep serving the last good dataset; try again next tick
+            print(f"Warning: dataset refresh failed: {e}")
+
+
+def start_watcher(interval=None):
+    global _watcher
+
+    interval = RELOAD_INTERVAL if interval is None else interval
+    if interval <= 0 or (_watcher is not None and _watcher.is_alive()):
+        return
+
+    _watcher_stop.clear()
+    _watcher = threading.Thread(target=_watch, args=(interval,), name="dataset-watcher", daemon=True)
+    _watcher.start()
+
+
+def stop_watcher():
+    _watcher_stop.set()
+
+
+# ===========================
+# ROUTER HELPERS
+# ===========================
+
+def load_data():
+    # Shallow copy: callers may add derived columns without touching the shared frame.
+    # In streaming mode this reads everything; handlers should use chunks() instead.
+    return get_dataset().materialize()
+
+
+def iter_chunks(columns=None):
+    return get_dataset().chunks(columns)
+
+
+def get_column(name):
+    return get_dataset().column(name)
+
+
+def dataset_version():
+    dataset = get_dataset()
+    if dataset.revision:
+        return f"{dataset.version}+{dataset.revision}"
+    return dataset.version
+
+
+def dataset_info():
+    return get_dataset().info()
+
+
+def memory_report():
+    return get_dataset().memory_report()
@@ -0,0 +1,218 @@
+import os
+import sqlite3
+import threading
+import time
+
+# ===========================
+# PERSISTENT RESULT CACHE
+# ===========================
+#
+# An SQLite key/value file under the in-memory caches. It holds encoded
+# analytics responses and prediction results, so a restart or a deploy
+# starts warm, and every worker on the node reads what any of them wrote:
+#
+#     data/.result_cache.sqlite
+#         entries(namespace, key, value BLOB, size, accessed)
+#
+# Callers put the dataset and model versions in their keys, so nothing
+# stale is ever read back; superseded entries simply stop being accessed
+# and are the first to go. Eviction is least-recently-accessed, down to
+# EVICT_TO of DISK_CACHE_BYTES whenever a write pushes the file over.
+#
+# Triggers keep the total size in a one-row ``meta`` table, so a write
+# checks the budget without summing the table. Reads never write: each
+# process collects the keys it hit and records their access times in one
+# transaction every TOUCH_SECONDS (or TOUCH_BATCH hits), so readers in
+# different workers do not queue on the write lock. Recency is therefore
+# as coarse as TOUCH_SECONDS, which is plenty for choosing what to evict.
+#
+# WAL mode lets workers read while one writes. Every failure is logged and
+# treated as a miss: the cache never fails a request.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+PATH = os.environ.get("DISK_CACHE_PATH", os.path.join(BASE_DIR, "data", ".result_cache.sqlite"))
+MAX_BYTES = int(os.environ.get("DISK_CACHE_BYTES", str(256 * 1024 * 1024)))
+EVICT_TO = 0.9              # evict to 90% so the next writes do not evict again
+TOUCH_SECONDS = 30.0
+TOUCH_BATCH = 512
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS entries (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        accessed REAL NOT NULL,
+        PRIMARY KEY (namespace, key)
+    )""",
+    "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)",
+    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    # A file from before the running total: start it from the entries it holds
+    "INSERT OR IGNORE INTO meta (name, value) SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries",
+    """CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+        UPDATE meta SET value = value + new.size WHERE name = 'bytes';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+        UPDATE meta SET value = value + new.size - old.size WHERE name = 'bytes';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+        UPDATE meta SET value = value - old.size WHERE name = 'bytes';
+    END""",
+)
+
+
+class DiskCache:
+    """Size-bounded SQLite key/value store shared by every process on the node."""
+
+    def __init__(self, path=PATH, max_bytes=MAX_BYTES):
+        self.path = path            # empty: disabled, every lookup misses
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._touched = {}          # (namespace, key) -> last hit, not yet written
+        self._touched_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connect(self):
+        # One connection per thread, reopened in a forked worker
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for statement in _SCHEMA:
+                    conn.execute(statement)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def _failed(self, action, e):
+        self._count("errors")
+        print(f"Warning: disk cache {action} failed: {e}")
+
+    def get(self, namespace, key):
+        """Stored bytes for ``key``, or None."""
+        if not self.path:
+            return None
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value FROM entries WHERE namespace = ? AND key = ?", (namespace, key),
+            ).fetchone()
+            if row is not None:
+                self._touch(conn, namespace, key)
+        except sqlite3.Error as e:
+            self._failed("read", e)
+            return None
+
+        self._count("misses" if row is None else "hits")
+        return None if row is None else bytes(row[0])
+
+    def put(self, namespace, key, value):
+        if not self.path or len(value) > self.max_bytes:
+            return
+        try:
+            conn = self._connect()
+            # An upsert, not REPLACE: REPLACE's implicit delete skips the size triggers
+            conn.execute(
+                """INSERT INTO entries (namespace, key, value, size, accessed) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (namespace, key) DO UPDATE
+                SET value = excluded.value, size = excluded.size, accessed = excluded.accessed""",
+                (namespace, key, sqlite3.Binary(value), len(value), time.time()),
+            )
+            self._count("writes")
+            self._evict(conn)
+        except sqlite3.Error as e:
+            self._failed("write", e)
+
+    def _touch(self, conn, namespace, key):
+        """Note a hit; write the pending access times when enough have piled up."""
+        with self._lock:
+            self._touched[(namespace, key)] = time.time()
+            due = (len(self._touched) >= TOUCH_BATCH
+                   or time.monotonic() - self._touched_at >= TOUCH_SECONDS)
+            if not due:
+                return
+            touched, self._touched = self._touched, {}
+            self._touched_at = time.monotonic()
+        self._write_touches(conn, touched)
+
+    def _write_touches(self, conn, touched):
+        try:
+            conn.executemany(
+                "UPDATE entries SET accessed = MAX(accessed, ?) WHERE namespace = ? AND key = ?",
+                [(accessed, namespace, key) for (namespace, key), accessed in touched.items()],
+            )
+        except sqlite3.Error as e:
+            # Only recency is lost; the entries themselves are fine
+            self._failed("access time update", e)
+
+    def _total(self, conn):
+        return conn.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+
+    def _evict(self, conn):
+        if self._total(conn) <= self.max_bytes:
+            return
+
+        # Recent hits count before choosing what to drop
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._touched_at = time.monotonic()
+        if touched:
+            self._write_touches(conn, touched)
+
+        excess = self._total(conn) - int(self.max_bytes * EVICT_TO)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            victims, freed = [], 0
+            for namespace, key, size in conn.execute("SELECT namespace, key, size FROM entries ORDER BY accessed"):
+                if freed >= excess:
+                    break
+                victims.append((namespace, key))
+                freed += size
+            conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", victims)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("evictions", len(victims))
+
+    def stats(self):
+        stats = {
+            "path": self.path or None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / (self.hits + self.misses), 4) if self.hits + self.misses else None,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "max_bytes": self.max_bytes,
+        }
+        if self.path:
+            try:
+                rows = self._connect().execute(
+                    "SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY namespace"
+                ).fetchall()
+                stats["namespaces"] = {name: {"entries": n, "bytes": size} for name, n, size in rows}
+                stats["bytes"] = sum(size for _, _, size in rows)
+            except sqlite3.Error as e:
+                self._failed("stats", e)
+        return stats
+
+
+disk = DiskCache()
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+# ===========================
+# DECLARED SCHEMA
+# ===========================
+#
+# Text columns load as pandas ``category`` (small integer codes plus a
+# sorted dictionary), so group-bys hash codes instead of Python strings.
+# Numeric columns are stored in the narrowest declared dtype that holds
+# the data losslessly; anything that does not fit keeps its parsed dtype.
+
+CATEGORICAL_COLUMNS = (
+    "Zoning Classification", "Road Type", "Alley Access", "Lot Shape", "Land Contour",
+    "Utility Availability", "Lot Configuration", "Land Slope", "Neighborhood Name",
+    "Primary Proximity Condition", "Secondary Proximity Condition", "Building Type",
+    "House Style", "Roof Style", "Roof Material", "Primary Exterior Material",
+    "Secondary Exterior Material", "Masonry Veneer Type", "Exterior Quality",
+    "Exterior Condition", "Foundation Type", "Basement Height Quality",
+    "Basement Condition", "Basement Exposure Level", "Basement Finish Type One",
+    "Basement Finish Type Two", "Heating System", "Heating Quality",
+    "Central Air Conditioning", "Electrical System", "Kitchen Quality",
+    "Home Functionality", "Fireplace Quality", "Garage Type", "Garage Finish Level",
+    "Garage Quality", "Garage Condition", "Driveway Paving", "Pool Quality",
+    "Fence Type", "Miscellaneous Feature", "Sale Type", "Sale Condition",
+)
+
+NUMERIC_DTYPES = {
+    "Id": "int32",
+    "Building Class": "int16",
+    "Lot Frontage Length": "float32",
+    "Lot Area Square Feet": "int32",
+    "Overall Material Quality": "int8",
+    "Overall Condition Rating": "int8",
+    "Construction Year": "int16",
+    "Remodel Year": "int16",
+    "Masonry Veneer Area": "float32",
+    "Basement Finished Area One": "int32",
+    "Basement Finished Area Two": "int32",
+    "Basement Unfinished Area": "int32",
+    "Total Basement Area": "int32",
+    "First Floor Area": "int32",
+    "Second Floor Area": "int32",
+    "Low Quality Finished Area": "int32",
+    "Above Ground Living Area": "int32",
+    "Basement Full Bathrooms": "int8",
+    "Basement Half Bathrooms": "int8",
+    "Full Bathrooms": "int8",
+    "Half Bathrooms": "int8",
+    "Bedrooms Above Ground": "int8",
+    "Kitchens Above Ground": "int8",
+    "Total Rooms Above Ground": "int8",
+    "Number of Fireplaces": "int8",
+    "Garage Construction Year": "float32",
+    "Garage Capacity Cars": "int8",
+    "Garage Area Square Feet": "int32",
+    "Wood Deck Area": "int32",
+    "Open Porch Area": "int32",
+    "Enclosed Porch Area": "int32",
+    "Three Season Porch Area": "int32",
+    "Screen Porch Area": "int32",
+    "Pool Area": "int32",
+    "Miscellaneous Value": "int32",
+    "Month Sold": "int8",
+    "Year Sold": "int16",
+    "House Sale Price": "int32",
+}
+
+
+def is_text(series):
+    return series.dtype == object or pd.api.types.is_string_dtype(series.dtype) \
+        or isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def native(value):
+    """A numpy scalar as the Python value it holds (JSON- and dict-key-friendly)."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def code_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def encode_categorical(series):
+    """Return ``(codes, labels)`` with labels sorted so group order matches strings."""
+    codes, labels = pd.factorize(series, sort=True, use_na_sentinel=True)
+    return codes.astype(code_dtype(len(labels))), np.asarray(labels, dtype=str)
+
+
+def _fits(values, dtype):
+    if values.dtype.kind == "f" and dtype.kind == "f":
+        narrowed = values.astype(dtype)
+        return bool(np.array_equal(narrowed.astype(values.dtype), values, equal_nan=True))
+
+    if values.dtype.kind in "iu" and dtype.kind in "iu":
+        if len(values) == 0:
+            return True
+        info = np.iinfo(dtype)
+        return info.min <= values.min() and values.max() <= info.max
+
+    return False
+
+
+def compact_numeric(name, values):
+    """Downcast ``values`` to the declared dtype for ``name`` when lossless."""
+    declared = NUMERIC_DTYPES.get(name)
+    if declared is None:
+        return values
+
+    dtype = np.dtype(declared)
+    if dtype == values.dtype or not _fits(values, dtype):
+        return values
+    return values.astype(dtype)
+
+
+def compact_frame(frame):
+    """Apply the plan in memory (used when no sidecar can be written)."""
+    columns = {}
+    for name in frame.columns:
+        series = frame[name]
+        if name in CATEGORICAL_COLUMNS or is_text(series):
+            codes, labels = encode_categorical(series)
+            columns[name] = pd.Categorical.from_codes(codes, categories=labels)
+        else:
+            columns[name] = compact_numeric(name, series.to_numpy())
+    return pd.DataFrame(columns, copy=False)
+
+
+# ===========================
+# MEMORY REPORT
+# ===========================
+
+def parsed_profile(frame):
+    """dtype and deep byte size of each column as parsed from the CSV."""
+    return {
+        name: {
+            "dtype": str(frame[name].dtype),
+            "bytes": int(frame[name].memory_usage(index=False, deep=True)),
+        }
+        for name in frame.columns
+    }
+
+
+def memory_report(profile, frame):
+    """Bytes per column as parsed from the CSV vs as loaded under this plan."""
+    columns = []
+    for name in frame.columns:
+        parsed = profile.get(name, {})
+        columns.append({
+            "column": name,
+            "parsed_dtype": parsed.get("dtype"),
+            "compact_dtype": str(frame[name].dtype),
+            "parsed_bytes": parsed.get("bytes"),
+            "compact_bytes": int(frame[name].memory_usage(index=False, deep=True)),
+        })
+
+    parsed_total = sum(c["parsed_bytes"] or 0 for c in columns)
+    compact_total = sum(c["compact_bytes"] for c in columns)
+
+    return {
+        "parsed_bytes": parsed_total,
+        "compact_bytes": compact_total,
+        "ratio": round(parsed_total / compact_total, 2) if compact_total else None,
+        "columns": columns,
+    }
@@ -0,0 +1,269 @@
+import numpy as np
+import pandas as pd
+
+from app.services import dataset_service, dtype_plan
+
+# ===========================
+# BITMAP INDEX
+# ===========================
+#
+# One bitmap per label of every categorical column, built once per dataset
+# version. Rows are split into segments that line up with the frames
+# ``Dataset.chunks()`` yields (one segment in memory mode), and each
+# segment of a bitmap is stored the way roaring bitmaps store containers:
+#
+#     uint32 row ids   when fewer than 1 row in SPARSE_RATIO matches
+#     packed bits      (np.packbits, 1 bit per row) otherwise
+#
+# ``col=a|b`` and ``col!=a`` filters then resolve with bitwise OR / AND /
+# NOT over packed words instead of comparing every row's value.
+
+SPARSE_RATIO = 32           # 4-byte ids beat 1-bit rows below 1 match in 32
+
+
+def _container(hits):
+    ids = np.flatnonzero(hits)
+    if len(ids) * SPARSE_RATIO < len(hits):
+        return ids.astype(np.uint32)
+    return np.packbits(hits)
+
+
+def _packed(container, rows):
+    if container.dtype == np.uint8:
+        return container
+    hits = np.zeros(rows, dtype=bool)
+    hits[container] = True
+    return np.packbits(hits)
+
+
+class BitmapIndex:
+    """Per-label row bitmaps for categorical columns, one segment per chunk."""
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.rows = []                                  # rows per segment
+        self.bitmaps = {column: {} for column in self.columns}
+
+    @classmethod
+    def from_chunks(cls, chunks, columns):
+        index = cls(columns)
+        for chunk in chunks:
+            index.add_segment(chunk)
+        return index
+
+    def arrays(self):
+        """``[(key, array), ...]`` holding the whole index (see ``shared_arena``)."""
+        items = [(("rows",), np.asarray(self.rows, dtype=np.int64))]
+        for column, labels in self.bitmaps.items():
+            for label, segments in labels.items():
+                for segment, container in segments.items():
+                    items.append((("bitmap", column, label, segment), container))
+        return items
+
+    @classmethod
+    def from_arrays(cls, columns, items):
+        index = cls(columns)
+        for key, values in items:
+            if key[0] == "rows":
+                index.rows = [int(rows) for rows in values]
+            else:
+                _, column, label, segment = key
+                index.bitmaps[column].setdefault(label, {})[segment] = values
+        return index
+
+    def add_segment(self, frame):
+        segment = len(self.rows)
+        self.rows.append(len(frame))
+
+        for column in self.columns:
+            codes, labels = pd.factorize(frame[column])
+            for code, label in enumerate(labels):
+                container = _container(codes == code)
+                self.bitmaps[column].setdefault(dtype_plan.native(label), {})[segment] = container
+
+    def covers(self, clause):
+        column, op, _ = clause
+        return op in ("=", "!=") and column in self.bitmaps
+
+    def _any(self, column, labels, segment):
+        rows = self.rows[segment]
+        bits = np.zeros((rows + 7) // 8, dtype=np.uint8)
+        for label in labels:
+            container = self.bitmaps[column].get(label, {}).get(segment)
+            if container is not None:
+                bits |= _packed(container, rows)
+        return bits
+
+    def select(self, segment, clauses):
+        """Boolean row mask of ``segment`` for ``=`` / ``!=`` clauses on indexed columns."""
+        rows = self.rows[segment]
+        bits = np.full((rows + 7) // 8, 0xFF, dtype=np.uint8)
+
+        for column, op, values in clauses:
+            hit = self._any(column, values, segment)
+            if op == "!=":
+                present = self._any(column, self.bitmaps[column], segment)
+                hit = present & ~hit
+            bits &= hit
+
+        return np.unpackbits(bits, count=rows).astype(bool)
+
+
+# ===========================
+# SORTED RANGE INDEX
+# ===========================
+#
+# For each range column: the row ids ordered by value (NaN dropped) next to
+# the sorted values. ``col >= a`` / ``col < b`` clauses become two binary
+# searches and a slice of row ids; several clauses on one column narrow the
+# same slice. Clauses on several columns intersect their slices, smallest
+# first, so a selective filter costs its matches rather than the table.
+
+RANGE_COLUMNS = (
+    "House Sale Price", "Above Ground Living Area", "Lot Area Square Feet",
+    "Construction Year", "Year Sold",
+)
+
+RANGE_OPS = (">", ">=", "<", "<=")
+
+
+class RangeIndex:
+    """Sorted permutation per numeric column over the rows of ``Dataset.chunks()``."""
+
+    def __init__(self, columns, order, sorted_values, starts):
+        self.columns = tuple(columns)
+        self.starts = starts                # first row of each segment, plus the total
+        self.order = order
+        self.sorted = sorted_values
+
+    @classmethod
+    def from_values(cls, columns, values, starts):
+        order, sorted_values = {}, {}
+        for column in columns:
+            permutation = np.argsort(values[column], kind="stable")
+            present = int((~np.isnan(values[column])).sum())      # NaN sorts last
+            order[column] = permutation[:present].astype(np.int64)
+            sorted_values[column] = values[column][order[column]]
+        return cls(columns, order, sorted_values, starts)
+
+    @classmethod
+    def from_chunks(cls, chunks, columns):
+        parts = {column: [] for column in columns}
+        starts = [0]
+        for chunk in chunks:
+            for column in columns:
+                parts[column].append(chunk[column].to_numpy(dtype=np.float64))
+            starts.append(starts[-1] + len(chunk))
+
+        values = {
+            column: np.concatenate(pieces) if pieces else np.empty(0)
+            for column, pieces in parts.items()
+        }
+        return cls.from_values(columns, values, starts)
+
+    def arrays(self):
+        """``[(key, array), ...]`` holding the whole index (see ``shared_arena``)."""
+        items = [(("starts",), np.asarray(self.starts, dtype=np.int64))]
+        for column in self.columns:
+            items.append((("order", column), self.order[column]))
+            items.append((("sorted", column), self.sorted[column]))
+        return items
+
+    @classmethod
+    def from_arrays(cls, columns, items):
+        arrays = dict(items)
+        order = {column: arrays[("order", column)] for column in columns}
+        sorted_values = {column: arrays[("sorted", column)] for column in columns}
+        return cls(columns, order, sorted_values, [int(start) for start in arrays[("starts",)]])
+
+    def covers(self, clause):
+        column, op, _ = clause
+        return op in RANGE_OPS and column in self.order
+
+    def positions(self, column, clauses):
+        """``[lo, hi)`` into the sorted values matching every clause on ``column``."""
+        values = self.sorted[column]
+        lo, hi = 0, len(values)
+        for _, op, (operand,) in clauses:
+            if op == ">":
+                lo = max(lo, int(np.searchsorted(values, operand, side="right")))
+            elif op == ">=":
+                lo = max(lo, int(np.searchsorted(values, operand, side="left")))
+            elif op == "<":
+                hi = min(hi, int(np.searchsorted(values, operand, side="left")))
+            else:
+                hi = min(hi, int(np.searchsorted(values, operand, side="right")))
+        return lo, max(lo, hi)
+
+    def rows(self, clauses):
+        """Sorted row ids matching every range clause."""
+        slices = []
+        for column in dict.fromkeys(c for c, _, _ in clauses):
+            lo, hi = self.positions(column, [c for c in clauses if c[0] == column])
+            slices.append(self.order[column][lo:hi])
+        slices.sort(key=len)
+
+        rows = np.sort(slices[0])
+        for ids in slices[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, ids, assume_unique=True)
+        return rows
+
+    def select(self, segment, clauses):
+        """Boolean row mask of ``segment`` for range clauses on indexed columns."""
+        start, end = self.starts[segment], self.starts[segment + 1]
+        rows = self.rows(clauses)
+        rows = rows[np.searchsorted(rows, start):np.searchsorted(rows, end)]
+        mask = np.zeros(end - start, dtype=bool)
+        mask[rows - start] = True
+        return mask
+
+
+# ===========================
+# DATASET WIRING
+# ===========================
+
+# Both indexes are built as arrays and go through ``Dataset.shared``, so
+# with a shared arena one process builds them and the others map them.
+# A streaming dataset gets neither: they hold whole-table arrays, which is
+# what streaming mode exists to avoid, so its scans evaluate every clause.
+
+def _build_bitmaps(dataset):
+    if dataset.streaming:
+        return None
+    columns = [c for c in dtype_plan.CATEGORICAL_COLUMNS if c in dataset.frame.columns]
+    items = dataset.shared("bitmap_index", lambda: BitmapIndex.from_chunks(dataset.chunks(columns), columns).arrays())
+    return BitmapIndex.from_arrays(columns, items)
+
+
+def _build_ranges(dataset):
+    if dataset.streaming:
+        return None
+    columns = [c for c in RANGE_COLUMNS if c in dataset.frame.columns]
+    items = dataset.shared("range_index", lambda: RangeIndex.from_chunks(dataset.chunks(columns), columns).arrays())
+    return RangeIndex.from_arrays(columns, items)
+
+
+def get_bitmap_index(dataset=None):
+    return (dataset or dataset_service.get_dataset()).derived("bitmap_index")
+
+
+def get_range_index(dataset=None):
+    return (dataset or dataset_service.get_dataset()).derived("range_index")
+
+
+def indexed_clauses(dataset, clauses):
+    """Split ``clauses`` into ``[(index, clauses it answers), ...]`` and the rest."""
+    indexes = (get_bitmap_index(dataset), get_range_index(dataset))
+    plan, rest = [], tuple(clauses)
+    for index in filter(None, indexes):
+        covered = tuple(clause for clause in rest if index.covers(clause))
+        if covered:
+            plan.append((index, covered))
+            rest = tuple(clause for clause in rest if not index.covers(clause))
+    return plan, rest
+
+
+dataset_service.register_derived("bitmap_index", _build_bitmaps)
+dataset_service.register_derived("range_index", _build_ranges)
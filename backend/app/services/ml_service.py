@@ -1,8 +1,13 @@
+import hashlib
 import joblib
+import json
 import os
 import pandas as pd
 import numpy as np
 
+from app.services.column_store import file_hash
+from app.services.disk_cache import disk
+
 MODEL_PATH = os.path.join(
     os.path.dirname(__file__),
     "..",
@@ -11,6 +16,7 @@ MODEL_PATH = os.path.join(
 )
 
 loaded_object = joblib.load(MODEL_PATH)
+MODEL_VERSION = file_hash(MODEL_PATH)[:12]     # part of every HTTP cache validator
 
 model = loaded_object["model"]
 scaler = loaded_object["scaler"]
@@ -18,6 +24,19 @@ label_encoders = loaded_object.get("label_encoders", {})  # Get label encoders i
 
 
 def predict_price(features):
+    # Same model, same inputs, same price: kept on disk across restarts and workers
+    payload = features.model_dump_json().encode("utf-8")
+    key = f"{MODEL_VERSION}:{hashlib.sha1(payload).hexdigest()}"
+    cached = disk.get("predictions", key)
+    if cached is not None:
+        return json.loads(cached)
+
+    price = _predict(features)
+    disk.put("predictions", key, json.dumps(price).encode("utf-8"))
+    return price
+
+
+def _predict(features):
     # Create DataFrame
     df = pd.DataFrame([{
         "MSSubClass": features.MSSubClass,
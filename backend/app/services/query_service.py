@@ -0,0 +1,350 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from app.services import dataset_service, dtype_plan, index_service
+from app.services.aggregate_service import OPERATORS, PRICE, get_aggregates
+from app.services.quantile_sketch import QuantileSketch
+from app.services.result_cache import MB, result_cache
+
+# ===========================
+# QUERY
+# ===========================
+#
+#   by      one or two group-by columns
+#   metric  mean | median | count | sum of ``value`` per group
+#   where   ``;``-separated clauses: ``col=a|b`` (any of), ``col!=a``,
+#           ``col>n``, ``col>=n``, ``col<n``, ``col<=n``
+#   sort    key (group order, like groupby) | desc | asc (by the metric)
+#
+# Queries are normalised (clauses sorted, numbers parsed) before they are
+# used as cache keys, so equivalent URLs share one cached result.
+
+METRICS = ("mean", "median", "count", "sum")
+SORTS = ("key", "desc", "asc")
+MAX_BY = 2
+CACHE_BYTES = 16 * MB
+
+Query = namedtuple("Query", ["by", "metric", "value", "where", "sort"])
+
+_CLAUSE = re.compile(r"^\s*(.+?)\s*(>=|<=|!=|=|>|<)\s*(.*?)\s*$")
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _split(text, sep):
+    return [part.strip() for part in (text or "").split(sep) if part.strip()]
+
+
+def _operand(frame, column, raw):
+    if pd.api.types.is_numeric_dtype(frame[column].dtype):
+        try:
+            return float(raw)
+        except ValueError:
+            raise QueryError(f"'{column}' is numeric, got '{raw}'")
+    return raw
+
+
+def parse_where(where, header=None):
+    """Parse a ``where`` string into sorted ``(column, op, values)`` clauses."""
+    header = dataset_service.get_dataset().frame if header is None else header
+    clauses = []
+
+    for text in _split(where, ";"):
+        match = _CLAUSE.match(text)
+        if not match:
+            raise QueryError(f"Bad where clause '{text}'")
+
+        column, op, raw = match.groups()
+        if column not in header.columns:
+            raise QueryError(f"Unknown column '{column}'")
+
+        if op in ("=", "!="):
+            values = tuple(sorted({_operand(header, column, v) for v in _split(raw, "|")}, key=str))
+        elif not pd.api.types.is_numeric_dtype(header[column].dtype):
+            raise QueryError(f"'{column}' is not numeric, '{op}' needs a number")
+        else:
+            values = (_operand(header, column, raw),)
+
+        if not values:
+            raise QueryError(f"No value in where clause '{text}'")
+        clauses.append((column, op, values))
+
+    return tuple(sorted(clauses, key=str))
+
+
+def parse_query(by, metric="mean", value=PRICE, where=None, sort="key"):
+    header = dataset_service.get_dataset().frame
+    by = tuple(_split(by, ",") if isinstance(by, str) else by)
+
+    if not 1 <= len(by) <= MAX_BY:
+        raise QueryError(f"'by' takes 1 to {MAX_BY} columns")
+    if metric not in METRICS:
+        raise QueryError(f"'metric' must be one of {', '.join(METRICS)}")
+    if sort not in SORTS:
+        raise QueryError(f"'sort' must be one of {', '.join(SORTS)}")
+
+    for column in by + (value,):
+        if column not in header.columns:
+            raise QueryError(f"Unknown column '{column}'")
+
+    if metric != "count" and not pd.api.types.is_numeric_dtype(header[value].dtype):
+        raise QueryError(f"'{value}' is not numeric")
+
+    return Query(by, metric, value, parse_where(where, header), sort)
+
+
+# ===========================
+# ENGINE
+# ===========================
+
+def clause_mask(frame, clauses):
+    mask = np.ones(len(frame), dtype=bool)
+    for column, op, values in clauses:
+        series = frame[column]
+        if op == "=":
+            hit = series.isin(values)
+        elif op == "!=":
+            hit = series.notna() & ~series.isin(values)
+        else:
+            hit = OPERATORS[op](series, values[0])
+        mask &= np.asarray(hit, dtype=bool)
+    return mask
+
+
+def _from_cube(dataset, query):
+    """Serve single-dimension price aggregates straight from the cube.
+
+    Medians come from the cube's quantile sketches only when the frame
+    cannot give exact ones: in streaming mode or once sales are ingested.
+    """
+    if len(query.by) != 1 or query.value != PRICE:
+        return None
+    if query.metric == "median" and not (dataset.streaming or dataset.revision):
+        return None
+
+    aggs = get_aggregates()
+    for d in aggs.dimensions.values():
+        if d.column != query.by[0] or d.bins is not None:
+            continue
+        where = () if d.where is None else ((d.where[0], d.where[1], (float(d.where[2]),)),)
+        if where != query.where:
+            continue
+
+        if query.metric == "median":
+            medians = aggs.medians(d.name)
+            return pd.DataFrame({d.column: list(medians), PRICE: list(medians.values())})
+
+        stats = aggs.stats(d.name, label=d.column)
+        column = "Count" if query.metric == "count" else PRICE
+        metric = {"count": "Count", "sum": "Sum", "mean": "Mean"}[query.metric]
+        return pd.DataFrame({d.column: stats[d.column], column: stats[metric]})
+
+    return None
+
+
+def _group_ids(frame, by):
+    """Factorise each group column (sorted) and fold them into one id per row."""
+    ids = np.zeros(len(frame), dtype=np.int64)
+    valid = np.ones(len(frame), dtype=bool)
+    uniques = []
+
+    for column in by:
+        codes, labels = pd.factorize(frame[column], sort=True)
+        valid &= codes >= 0
+        ids = ids * max(len(labels), 1) + codes
+        uniques.append(labels)
+
+    return ids, valid, uniques
+
+
+def _keys(ids, uniques):
+    """Turn combined group ids back into one key column per ``by`` column."""
+    keys = []
+    for labels in reversed(uniques):
+        size = max(len(labels), 1)
+        keys.append([dtype_plan.native(labels[i]) for i in ids % size])
+        ids = ids // size
+    return keys[::-1]
+
+
+def _select(dataset, columns, clauses):
+    """Yield ``(chunk, mask, first_row)`` over ``columns``: indexes answer what they can.
+
+    Ingested sales follow the file as one last chunk, so a scan sees the
+    same rows as the price cube.
+    """
+    plan, rest = index_service.indexed_clauses(dataset, clauses)
+    needed = list(dict.fromkeys(list(columns) + [c for c, _, _ in rest]))
+
+    first_row = 0
+    for segment, chunk in enumerate(dataset.chunks(needed)):
+        mask = clause_mask(chunk, rest)
+        for index, covered in plan:
+            mask &= index.select(segment, covered)
+        yield chunk, mask, first_row
+        first_row += len(chunk)
+
+    if dataset.revision:
+        # No index covers the sales: every clause is evaluated on them
+        needed = list(dict.fromkeys(list(columns) + [c for c, _, _ in clauses]))
+        sales = get_aggregates().sales.frame(needed)
+        if len(sales):
+            yield sales, clause_mask(sales, clauses), first_row
+
+
+def filtered_chunks(columns, where=()):
+    """The chunks of ``columns`` matching ``where``, indexed by row number (sales after the file)."""
+    columns = list(columns)
+    for chunk, mask, first_row in _select(dataset_service.get_dataset(), columns, where):
+        chunk = chunk[columns].set_axis(pd.RangeIndex(first_row, first_row + len(chunk)))
+        yield chunk if mask.all() else chunk[mask]
+
+
+def _scan(dataset, query):
+    columns = list(dict.fromkeys(query.by + (query.value,)))
+    partials = {}
+    for chunk, mask, _ in _select(dataset, columns, query.where):
+        ids, valid, uniques = _group_ids(chunk, query.by)
+
+        values = chunk[query.value]
+        if query.metric == "count":
+            valid &= values.notna().to_numpy()
+            values = np.ones(len(chunk))
+        else:
+            values = values.to_numpy(dtype=np.float64)
+            valid &= ~np.isnan(values)
+
+        keep = mask & valid
+        ids, values = ids[keep], values[keep]
+        present, inverse = np.unique(ids, return_inverse=True)
+        n = len(present)
+        keys = list(zip(*_keys(present, uniques))) if n else []
+
+        if query.metric == "median":
+            ordered = values[np.lexsort((values, inverse))]
+            count = np.bincount(inverse, minlength=n)
+            start = np.cumsum(count) - count
+
+            if not (dataset.streaming or dataset.revision):
+                # The only chunk: exact medians straight from the sorted groups
+                medians = (ordered[start + (count - 1) // 2] + ordered[start + count // 2]) / 2
+                partials = {key: [int(c), float(m)] for key, c, m in zip(keys, count, medians)}
+                continue
+
+            for key, first, c in zip(keys, start, count):
+                stats = partials.setdefault(key, [0, QuantileSketch()])
+                stats[0] += int(c)
+                stats[1].update(ordered[first:first + c])
+            continue
+
+        count = np.bincount(inverse, minlength=n)
+        total = np.bincount(inverse, weights=values, minlength=n)
+        for key, c, t in zip(keys, count, total):
+            stats = partials.setdefault(key, [0, 0.0])
+            stats[0] += int(c)
+            stats[1] += float(t)
+
+    items = sorted(partials.items(), key=lambda item: item[0])
+    if query.metric == "count":
+        column, result = "Count", [stats[0] for _, stats in items]
+    elif query.metric == "sum":
+        column, result = query.value, [stats[1] for _, stats in items]
+    elif query.metric == "mean":
+        column, result = query.value, [stats[1] / stats[0] for _, stats in items]
+    else:
+        column, result = query.value, [_median(stats[1]) for _, stats in items]
+
+    data = {col: [key[i] for key, _ in items] for i, col in enumerate(query.by)}
+    data[column] = result
+    return pd.DataFrame(data, columns=list(query.by) + [column])
+
+
+def _median(partial):
+    return partial.quantile(0.5) if isinstance(partial, QuantileSketch) else partial
+
+
+def _sorted(data, sort):
+    if sort == "key":
+        return data
+    metric = data.columns[-1]
+    return data.sort_values(metric, ascending=(sort == "asc"), kind="stable").reset_index(drop=True)
+
+
+# ===========================
+# ROW PAGES
+# ===========================
+#
+# Row endpoints page by keyset: rows keep their row number in the file as a
+# stable key, the cursor is the last key a client has seen, and a page is
+# the next ``limit`` matching rows after it. Appended sales never shift the
+# keys of earlier rows, so a cursor stays valid while the table grows.
+
+class Page(namedtuple("Page", ["rows", "total", "next_cursor"])):
+
+    def headers(self):
+        headers = {"X-Total-Count": str(self.total)}
+        if self.next_cursor is not None:
+            headers["X-Next-Cursor"] = str(self.next_cursor)
+        return headers
+
+
+def project(rows, fields=None):
+    """``rows`` restricted to ``fields`` (all columns when not given)."""
+    if not fields:
+        return rows
+    unknown = [f for f in fields if f not in rows.columns]
+    if unknown:
+        raise QueryError(f"Unknown field '{unknown[0]}'")
+    return rows[list(fields)]
+
+
+def paginate(chunks, limit=None, cursor=None, fields=None):
+    """One keyset page of ``chunks`` (frames indexed by row number), projected to ``fields``."""
+    total, after, pieces = 0, 0, []
+    taken = 0
+
+    for chunk in chunks:
+        total += len(chunk)
+        if cursor is not None:
+            chunk = chunk[chunk.index > cursor]
+        after += len(chunk)
+
+        if limit is not None:
+            chunk = chunk.iloc[:max(limit - taken, 0)]
+        if len(chunk) or not pieces:
+            pieces.append(chunk)
+        taken += len(chunk)
+
+    rows = pd.concat(pieces) if len(pieces) > 1 else (pieces[0] if pieces else pd.DataFrame())
+    rows = project(rows, fields)
+
+    next_cursor = int(rows.index[-1]) if limit is not None and after > taken else None
+    return Page(rows, total, next_cursor)
+
+
+# ===========================
+# RESULT CACHE
+# ===========================
+
+@result_cache("aggregate", max_bytes=CACHE_BYTES)
+def _evaluate(query):
+    dataset = dataset_service.get_dataset()
+    data = _from_cube(dataset, query)
+    if data is None:
+        data = _scan(dataset, query)
+    return _sorted(data, query.sort)
+
+
+def run(query):
+    """Result for a parsed ``query``, cached per dataset version."""
+    return _evaluate(query).copy()
+
+
+def aggregate(by, metric="mean", value=PRICE, where=None, sort="key"):
+    """``df.groupby(by)[value].<metric>()`` as a DataFrame, via the shared engine."""
+    return run(parse_query(by, metric, value, where, sort))
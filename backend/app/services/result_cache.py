@@ -0,0 +1,154 @@
+import functools
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache, TTLCache
+from cachetools.keys import hashkey
+
+from app.services import dataset_service
+
+# ===========================
+# RESULT CACHE
+# ===========================
+#
+#     @result_cache("aggregate", max_bytes=16 * MB, ttl=None)
+#     def evaluate(query): ...
+#
+# An in-process memo for service functions that return frames or arrays,
+# such as query_service's evaluation of a parsed query. Arguments must be
+# hashable: parse request input into a hashable form (a Query namedtuple,
+# a tuple of clauses) before calling. HTTP responses are not cached here;
+# response_cache does that a layer up, sizing entries by their encoded
+# bodies.
+#
+# Each decorated function gets its own cachetools cache: LRUCache, or
+# TTLCache when ``ttl`` is set. Caches are bounded by the byte size of what
+# they hold (``nbytes``), not by entry count, so a few large frames cannot
+# crowd out the process. Keys are the dataset version plus the call
+# arguments, so a reload or an ingested sale never serves an old result;
+# those entries just age out.
+#
+# Every cache registers under its name. ``stats()`` (GET /api/cache/stats)
+# reports hits, misses, hit rate, evictions, expirations and bytes held.
+
+MB = 1024 * 1024
+
+_registry = {}
+
+
+def nbytes(value):
+    """Approximate memory held by a cached value."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, tuple):
+        return sum(nbytes(item) for item in value) + sys.getsizeof(value)
+    return sys.getsizeof(value)
+
+
+class _Counting:
+    """Eviction and expiry counters for a cachetools cache class."""
+
+    evictions = 0
+    expired = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def expire(self, time=None):
+        items = super().expire(time)
+        self.expired += len(items)
+        return items
+
+
+class _LRU(_Counting, LRUCache):
+    pass
+
+
+class _TTL(_Counting, TTLCache):
+    pass
+
+
+class StatsCache:
+    """A byte-bounded cachetools cache with a lock and hit/miss counters."""
+
+    def __init__(self, name, max_bytes, ttl=None, getsizeof=nbytes):
+        self.name = name
+        self.ttl = ttl
+        if ttl:
+            self.cache = _TTL(max_bytes, ttl, getsizeof=getsizeof)
+        else:
+            self.cache = _LRU(max_bytes, getsizeof=getsizeof)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.oversized = 0
+        _registry[name] = self
+
+    def get(self, key):
+        with self.lock:
+            value = self.cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            try:
+                self.cache[key] = value
+            except ValueError:          # larger than the whole cache
+                self.oversized += 1
+
+    def stats(self):
+        with self.lock:
+            if isinstance(self.cache, TTLCache):
+                self.cache.expire()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.cache.evictions,
+                "expired": self.cache.expired,
+                "oversized": self.oversized,
+                "entries": len(self.cache),
+                "bytes": int(self.cache.currsize),
+                "max_bytes": int(self.cache.maxsize),
+                "ttl": self.ttl,
+            }
+
+
+def result_cache(name, max_bytes, ttl=None):
+    """Cache a function's results per dataset version and arguments (hashable)."""
+    def decorate(function):
+        cache = StatsCache(name, max_bytes, ttl)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            key = hashkey(dataset_service.dataset_version(), *args, **kwargs)
+            value = cache.get(key)
+            if value is None:
+                value = function(*args, **kwargs)
+                cache.put(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorate
+
+
+def stats():
+    return {name: cache.stats() for name, cache in sorted(_registry.items())}
@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from app.services.dataset_service import DATA_PATH
+
+# ===========================
+# APPEND-ONLY SALES LOG
+# ===========================
+#
+# Sales posted to /api/sales land here, one JSON object per line, next to
+# the CSV they extend. The log is only ever appended to; readers keep a
+# byte offset and pick up whatever was written after it, so every worker
+# on the node converges on the same aggregates.
+#
+# A CSV drop that replaces the file while the server runs is taken to
+# include every sale logged before the drop was written (its mtime). The
+# first worker to load it records a checkpoint beside the log, the byte
+# offset of the first sale after that moment, and every later load of the
+# same file seeks straight there instead of replaying what the file
+# already holds. The log before the checkpoint is no longer read and can
+# be archived. A file seen for the first time at startup is not assumed
+# to include anything: the whole log is replayed on top of it.
+
+LOG_PATH = os.path.join(os.path.dirname(DATA_PATH), "sales_log.jsonl")
+
+_lock = threading.Lock()
+
+
+def append(records):
+    """Append ``records`` (dicts keyed by dataset column) to the log in one write."""
+    received_at = time.time()
+    lines = "".join(
+        json.dumps({**record, "_received_at": received_at}, separators=(",", ":")) + "\n"
+        for record in records
+    )
+
+    with _lock:
+        # One O_APPEND write per batch keeps lines from different workers intact
+        fd = os.open(LOG_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, lines.encode("utf-8"))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    return len(records)
+
+
+def read_from(offset):
+    """Return ``(records, new_offset)`` for complete lines written after ``offset``."""
+    if not os.path.exists(LOG_PATH):
+        return [], offset
+
+    with open(LOG_PATH, "rb") as f:
+        f.seek(offset)
+        chunk = f.read()
+
+    end = chunk.rfind(b"\n") + 1      # ignore a line still being written
+    records = []
+    for line in chunk[:end].splitlines():
+        if line.strip():
+            record = json.loads(line)
+            record.pop("_received_at", None)
+            records.append(record)
+
+    return records, offset + end
+
+
+def _checkpoint_path():
+    return os.path.splitext(LOG_PATH)[0] + ".checkpoint.json"
+
+
+def _read_checkpoint():
+    try:
+        with open(_checkpoint_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _offset_after(start, moment):
+    """Offset of the first complete line after ``start`` logged later than ``moment``."""
+    if not os.path.exists(LOG_PATH):
+        return start
+
+    offset = start
+    with open(LOG_PATH, "rb") as f:
+        f.seek(start)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break                   # still being written
+            if line.strip() and json.loads(line).get("_received_at", 0) > moment:
+                break
+            offset += len(line)
+    return offset
+
+
+def start_offset(source_hash, source_mtime, drop=False):
+    """Where replaying the log on top of the source ``source_hash`` starts.
+
+    ``drop`` marks a file that replaced the previous one while running: a
+    checkpoint past the sales it includes is recorded for it.
+    """
+    saved = _read_checkpoint()
+    if saved is not None and saved["source_hash"] == source_hash:
+        return saved["offset"]
+    if not drop:
+        return 0
+
+    # Sales before an older checkpoint are in that older file, and so in this one
+    start = saved["offset"] if saved is not None and saved["source_mtime"] <= source_mtime else 0
+    offset = _offset_after(start, source_mtime)
+    try:
+        directory = os.path.dirname(os.path.abspath(LOG_PATH))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"source_hash": source_hash, "source_mtime": source_mtime, "offset": offset}, f)
+        os.replace(tmp, _checkpoint_path())
+    except OSError as e:
+        print(f"Warning: could not record sales log checkpoint: {e}")
+    return offset
@@ -0,0 +1,142 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from app.services import dataset_service
+from app.services.aggregate_service import PRICE
+from app.services.query_service import Page, paginate, project
+from app.services.result_cache import MB, StatsCache
+
+# ===========================
+# SCATTER DOWNSAMPLING
+# ===========================
+#
+# Scatter endpoints take ``max_points=`` and one of three reductions of
+# the (x, y) cloud, each computed with vectorised NumPy over the matching
+# rows and cached per dataset version:
+#
+#   lttb        Largest-Triangle-Three-Buckets: x-sorted buckets, one point
+#               per bucket maximising the triangle with its neighbours, so
+#               peaks and troughs of the shape survive
+#   stratified  a sqrt(max_points)^2 grid over x and y, one row per
+#               occupied cell, so sparse outliers survive next to dense cores
+#   density     the same grid as counts and mean price per cell
+
+CACHE_BYTES = 32 * MB
+
+
+def lttb(x, y, n):
+    """Row positions of the LTTB sample of ``n`` points (all rows when fewer)."""
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+
+    order = np.argsort(x)
+    x, y = x[order], y[order]
+
+    # n - 2 buckets between the first and the last point
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    # Means from prefix sums: reduceat would run the last bucket to the end
+    sum_x = np.concatenate(([0.0], np.cumsum(x, dtype=np.float64)))
+    sum_y = np.concatenate(([0.0], np.cumsum(y, dtype=np.float64)))
+    bucket_x = (sum_x[ends] - sum_x[starts]) / (ends - starts)
+    bucket_y = (sum_y[ends] - sum_y[starts]) / (ends - starts)
+    next_x = np.append(bucket_x[1:], x[-1])
+    next_y = np.append(bucket_y[1:], y[-1])
+
+    selected = np.empty(n, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    a = 0
+    for i, (lo, hi) in enumerate(zip(starts, ends)):
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (next_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return order[selected]
+
+
+def _cells(values, side):
+    low, high = values.min(), values.max()
+    width = (high - low) / side or 1.0
+    return np.clip(((values - low) / width).astype(np.int64), 0, side - 1), low, width
+
+
+def _grid(x, y, n):
+    """Cell id of every point on a ~sqrt(n) x sqrt(n) grid, and the grid geometry."""
+    side = max(int(math.sqrt(n)), 1)
+    col, x_low, x_width = _cells(x, side)
+    row, y_low, y_width = _cells(y, side)
+    return col * side + row, side, (x_low, x_width), (y_low, y_width)
+
+
+def stratified(x, y, n):
+    """Row positions of the first row in each occupied grid cell."""
+    if n >= len(x):
+        return np.arange(len(x))
+    cells, side, _, _ = _grid(x, y, n)
+
+    # Assigning in reverse leaves the first row of each cell in place
+    first = np.full(side * side, -1, dtype=np.int64)
+    first[cells[::-1]] = np.arange(len(cells) - 1, -1, -1)
+    return np.sort(first[first >= 0])
+
+
+def density(x, y, prices, n, x_name, y_name):
+    """Occupied grid cells: centre, row count and mean price."""
+    if not len(x):
+        return pd.DataFrame(columns=[x_name, y_name, "Count", "AvgPrice"])
+
+    cells, side, (x_low, x_width), (y_low, y_width) = _grid(x, y, n)
+    count = np.bincount(cells, minlength=side * side)
+    total = np.bincount(cells, weights=prices, minlength=side * side)
+    present = np.flatnonzero(count)
+
+    col, row = present // side, present % side
+    return pd.DataFrame({
+        x_name: x_low + (col + 0.5) * x_width,
+        y_name: y_low + (row + 0.5) * y_width,
+        "Count": count[present],
+        "AvgPrice": total[present] / count[present],
+    })
+
+
+def downsample(rows, x_name, y_name, max_points, method):
+    x = rows[x_name].to_numpy(dtype=np.float64)
+    y = rows[y_name].to_numpy(dtype=np.float64)
+
+    if method == "density":
+        return density(x, y, rows[PRICE].to_numpy(dtype=np.float64), max_points, x_name, y_name)
+
+    positions = lttb(x, y, max_points) if method == "lttb" else stratified(x, y, max_points)
+    return rows.iloc[positions]
+
+
+# ===========================
+# CACHE
+# ===========================
+
+_samples = StatsCache("scatter_samples", CACHE_BYTES)
+
+
+def scatter_page(key, chunks, params, x, y=PRICE):
+    """Rows of a scatter endpoint: downsampled when ``params.max_points`` is set, else one page.
+
+    ``key`` names the endpoint and its filters; samples are cached under it
+    and the dataset version, so repeated chart loads skip the reduction.
+    """
+    if not params.max_points:
+        return paginate(chunks, params.limit, params.cursor, params.field_list())
+
+    key = (dataset_service.dataset_version(), key, params.max_points, params.sample)
+    cached = _samples.get(key)
+    if cached is None:
+        full = paginate(chunks)
+        cached = Page(downsample(full.rows, x, y, params.max_points, params.sample), full.total, None)
+        _samples.put(key, cached)
+
+    return Page(project(cached.rows, params.field_list()), cached.total, None)
@@ -0,0 +1,288 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:         # optional: without flock every process keeps its own arrays
+    fcntl = None
+
+# ===========================
+# SHARED ARENA
+# ===========================
+#
+# The frame itself is already shared: its columns are memory-mapped from
+# the column sidecar. The derived structures built from it (bitmap
+# containers, range-index permutations) are plain arrays every worker used
+# to build and hold privately, again after every hot reload. Instead, the
+# first process that needs one for a dataset version writes its arrays to
+# a RAM-backed directory and every process maps them read-only:
+#
+#     /dev/shm/houseprice-arena/<version>-f1/
+#         range_index/manifest.json   [[key, file], ...]
+#         range_index/a0000.npy ...
+#         holders/<pid>               one file per process using the version
+#     /dev/shm/houseprice-arena/<version>-f1.lock
+#
+# Lifetime is reference counted through the holder files. A process adds
+# its pid when a Dataset of that version attaches, and removes it when the
+# last such Dataset is dropped after a reload. Whoever finds no live holder
+# left deletes the version; holders of crashed processes are swept the
+# same way. Mapped pages outlive the unlink, so in-flight readers are never
+# cut off. Every step runs under the version's flock, kept beside the
+# directory and unlinked with it; a process that was waiting on a lock file
+# that has since been unlinked notices and locks the new one instead.
+#
+# A preloading server (gunicorn.conf.py) loads the dataset in the master
+# and forks workers that inherit its Arena objects. The master calls
+# ``disown()`` so its own pid never keeps a version alive, and each worker
+# calls ``adopt()`` after the fork to hold the inherited versions under
+# its pid.
+
+FORMAT_VERSION = 1
+ARENA_DIR = os.environ.get(
+    "SHARED_ARENA_DIR",
+    "/dev/shm/houseprice-arena" if os.path.isdir("/dev/shm") else "",
+)
+MANIFEST = "manifest.json"
+HOLDERS = "holders"
+
+_local = {}                 # (pid, path) -> Datasets of this process holding it
+_local_lock = threading.Lock()
+
+
+def enabled():
+    return bool(ARENA_DIR) and fcntl is not None
+
+
+class _Locked:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        while True:
+            self.file = open(self.path, "a")
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+            try:
+                if os.stat(self.path).st_ino == os.fstat(self.file.fileno()).st_ino:
+                    return self
+            except FileNotFoundError:
+                pass
+            # Unlinked with its version while we waited: lock the current file
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def pid_alive(pid):
+    """Whether process ``pid`` exists (it may belong to another user)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _live_holders(path):
+    holders = os.path.join(path, HOLDERS)
+    try:
+        pids = [int(name) for name in os.listdir(holders) if name.isdigit()]
+    except FileNotFoundError:
+        return []
+
+    live = []
+    for pid in pids:
+        if pid_alive(pid):
+            live.append(pid)
+        else:
+            _unlink(os.path.join(holders, str(pid)))
+    return live
+
+
+def _unlink(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _delete(path):
+    """Delete a version and its lock file; the caller holds that lock."""
+    shutil.rmtree(path, ignore_errors=True)
+    _unlink(path + ".lock")
+
+
+def _write_holder(path):
+    os.makedirs(os.path.join(path, HOLDERS), exist_ok=True)
+    open(os.path.join(path, HOLDERS, str(os.getpid())), "w").close()
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(directory, items):
+    """Write ``[(key, array), ...]`` as .npy files plus a manifest, atomically."""
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    work_dir = tempfile.mkdtemp(dir=parent, prefix=".build-")
+
+    try:
+        manifest = []
+        for i, (key, values) in enumerate(items):
+            file = f"a{i:04d}.npy"
+            np.save(os.path.join(work_dir, file), np.ascontiguousarray(values))
+            manifest.append([key, file])
+
+        with open(os.path.join(work_dir, MANIFEST), "w") as f:
+            json.dump(manifest, f)
+        os.rename(work_dir, directory)
+    except OSError:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    return manifest
+
+
+class Arena:
+    """Shared, read-only arrays of one dataset version."""
+
+    def __init__(self, version, root=None):
+        self.name = f"{version}-f{FORMAT_VERSION}"
+        self.root = root or ARENA_DIR
+        self.path = os.path.join(self.root, self.name)
+        self.lock_path = self.path + ".lock"
+        self.held = False
+
+    # ---------- lifetime ----------
+
+    def hold(self):
+        if self.held:
+            return
+        key = (os.getpid(), self.path)
+        with _local_lock:
+            first = _local.get(key, 0) == 0
+            _local[key] = _local.get(key, 0) + 1
+        if first:
+            with _Locked(self.lock_path):
+                _write_holder(self.path)
+            sweep(self.root, keep=self.name)
+        self.held = True
+
+    def release(self):
+        """Drop this process's hold; the last live holder deletes the version."""
+        if not self.held:
+            return
+        self.held = False
+        key = (os.getpid(), self.path)
+        with _local_lock:
+            count = _local.get(key, 0) - 1
+            if count > 0:
+                _local[key] = count
+                return
+            _local.pop(key, None)
+
+        with _Locked(self.lock_path):
+            _unlink(os.path.join(self.path, HOLDERS, str(os.getpid())))
+            if not _live_holders(self.path):
+                _delete(self.path)
+
+    # ---------- arrays ----------
+
+    def share(self, name, build):
+        """``build()``'s ``[(key, array), ...]``, mapped read-only from the arena.
+
+        Keys must be JSON values. The first process to ask builds and
+        writes; the others map what it wrote. When the arena cannot be
+        written (e.g. /dev/shm is full) the privately built arrays are
+        returned instead, as column_store does without its sidecar.
+        """
+        items = None
+        try:
+            self.hold()
+            directory = os.path.join(self.path, name)
+            manifest = _read_manifest(directory)
+            if manifest is None:
+                with _Locked(self.lock_path):
+                    manifest = _read_manifest(directory)
+                    if manifest is None:
+                        items = build()
+                        manifest = _write(directory, items)
+
+            return [
+                (_key(key), np.load(os.path.join(directory, file), mmap_mode="r"))
+                for key, file in manifest
+            ]
+        except OSError as e:
+            print(f"Warning: could not share {name} through {self.path}: {e}")
+            return build() if items is None else items
+
+    def nbytes(self):
+        total = 0
+        for folder, _, files in os.walk(self.path):
+            total += sum(os.path.getsize(os.path.join(folder, f)) for f in files if f.endswith(".npy"))
+        return total
+
+
+def _key(key):
+    # JSON turns tuples into lists; hand back the hashable form
+    return tuple(_key(k) for k in key) if isinstance(key, list) else key
+
+
+def disown():
+    """Stop this process's pid holding its versions; its local holds stay.
+
+    For a parent that forks workers: the children ``adopt()`` the holds,
+    so a version lives as long as a worker uses it, not as long as the
+    parent runs.
+    """
+    pid = os.getpid()
+    with _local_lock:
+        paths = [path for owner, path in _local if owner == pid]
+    for path in paths:
+        with _Locked(path + ".lock"):
+            _unlink(os.path.join(path, HOLDERS, str(pid)))
+
+
+def adopt():
+    """In a forked child: hold the versions the parent held, under this pid."""
+    pid = os.getpid()
+    with _local_lock:
+        inherited = [(owner, path) for owner, path in _local if owner != pid]
+        for owner, path in inherited:
+            _local[(pid, path)] = _local.get((pid, path), 0) + _local.pop((owner, path))
+    for _, path in inherited:
+        with _Locked(path + ".lock"):
+            _write_holder(path)
+
+
+def sweep(root=None, keep=None):
+    """Delete arena versions whose holders have all exited (crashed workers)."""
+    root = root or ARENA_DIR
+    try:
+        entries = set(os.listdir(root))
+    except FileNotFoundError:
+        return
+
+    # Versions, and lock files whose version is already gone
+    names = {e[:-len(".lock")] if e.endswith(".lock") else e for e in entries if not e.startswith(".")}
+    for name in sorted(names):
+        if name == keep:
+            continue
+        path = os.path.join(root, name)
+        with _Locked(path + ".lock"):
+            if not os.path.isdir(path) or not _live_holders(path):
+                _delete(path)
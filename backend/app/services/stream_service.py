@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.services import dtype_plan
+from app.services.quantile_sketch import QuantileSketch
+
+# ===========================
+# CHUNKED SOURCE
+# ===========================
+#
+# In streaming mode (DATASET_MODE=stream) nothing holds the full frame.
+# Handlers pull fixed-size chunks through ``Dataset.chunks(columns)`` and
+# fold each one into mergeable partials (count, sum, min/max, quantile
+# sketch), so memory is bounded by the chunk size and the number of groups,
+# not by the number of sales. In memory mode the same pipeline sees one chunk.
+
+CHUNK_ROWS = int(os.environ.get("DATASET_CHUNK_ROWS", "250000"))
+
+
+def iter_chunks(path, columns=None, chunk_rows=None):
+    """Yield the CSV at ``path`` as frames of at most ``chunk_rows`` rows."""
+    usecols = list(columns) if columns is not None else None
+    wanted = usecols or []
+    dtype = {
+        name: "category"
+        for name in dtype_plan.CATEGORICAL_COLUMNS
+        if usecols is None or name in wanted
+    }
+
+    reader = pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunk_rows or CHUNK_ROWS)
+    with reader:
+        for chunk in reader:
+            yield chunk[usecols] if usecols is not None else chunk
+
+
+# ===========================
+# MERGEABLE PARTIALS
+# ===========================
+
+def grouped_mean(chunks, by, values):
+    """``groupby(by)[values].mean().reset_index()`` over any number of chunks."""
+    values = list(values)
+    sums = counts = None
+
+    for chunk in chunks:
+        grouped = chunk.groupby(by, observed=True)[values]
+        part_sum, part_count = grouped.sum(), grouped.count()
+        if sums is None:
+            sums, counts = part_sum, part_count
+        else:
+            sums = sums.add(part_sum, fill_value=0)
+            counts = counts.add(part_count, fill_value=0)
+
+    if sums is None:
+        return pd.DataFrame(columns=[by] + values)
+
+    return (sums / counts).sort_index().reset_index()
+
+
+def describe(chunks, column):
+    """Like ``Series.describe()``; quartiles come from a quantile sketch."""
+    count, total, total_sq = 0, 0.0, 0.0
+    low, high = np.inf, -np.inf
+    sketch = QuantileSketch()
+
+    for chunk in chunks:
+        values = chunk[column].dropna().to_numpy(dtype=np.float64)
+        if not len(values):
+            continue
+        count += len(values)
+        total += values.sum()
+        total_sq += np.square(values).sum()
+        low, high = min(low, values.min()), max(high, values.max())
+        sketch.update(values)
+
+    if count == 0:
+        return pd.Series(dtype=float)
+
+    mean = total / count
+    variance = (total_sq - count * mean * mean) / (count - 1) if count > 1 else np.nan
+
+    return pd.Series({
+        "count": float(count),
+        "mean": mean,
+        "std": float(np.sqrt(max(variance, 0.0))) if count > 1 else np.nan,
+        "min": low,
+        "25%": sketch.quantile(0.25),
+        "50%": sketch.quantile(0.50),
+        "75%": sketch.quantile(0.75),
+        "max": high,
+    })
+
+
+def collect(chunks, dropna=True):
+    """Concatenate the (usually narrow) chunks a row-returning endpoint needs."""
+    pieces = [chunk.dropna() if dropna else chunk for chunk in chunks]
+    if not pieces:
+        return pd.DataFrame()
+    return pd.concat(pieces, ignore_index=True) if len(pieces) > 1 else pieces[0]
@@ -0,0 +1,313 @@
+import argparse
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# ===========================
+# STATIC ANALYTICS SNAPSHOTS
+# ===========================
+#
+#     python -m app.snapshot build [--out DIR] [--keep N]
+#     python -m app.snapshot serve [--dir DIR] [--port PORT]
+#
+# ``build`` runs every GET route of the analytics routers (quality,
+# utilities, features, price trends, location, map) through the real app,
+# with default parameters, and writes the response bodies to
+#
+#     DIR/<dataset version>/api/quality/overall.json     (+ .gz)
+#     DIR/<dataset version>/api/map.html                 (+ .gz)
+#     DIR/<dataset version>/manifest.json
+#
+# then points DIR/CURRENT at the new version. ``serve`` (or any ASGI
+# server pointed at ``app.snapshot:app`` with SNAPSHOT_DIR set) answers
+# those paths from the current snapshot: bytes held in memory, ETag and
+# gzip as the live app sends them, and neither pandas nor the dataset
+# imported. A new build is picked up on the next request.
+#
+# Only the default (unparameterized) responses are stored, so a request
+# with a query string gets a 400. Pages that filter on the server, like
+# the Utilities garage-age chart, fall back to the unfiltered route and
+# filter the rows themselves when that happens.
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join(os.path.dirname(__file__), "..", "snapshots"))
+KEEP = 3                    # snapshot versions left on disk after a build
+
+SNAPSHOT_ROUTERS = (
+    "quality_router", "utilities_router", "feature_routes",
+    "price_trends_router", "location_router", "map_router",
+)
+
+SUFFIXES = {"application/json": ".json", "text/html": ".html"}
+
+
+# ===========================
+# BUILD
+# ===========================
+
+def _get(asgi_app, path):
+    """Status, headers and body of ``GET path`` on ``asgi_app``, run in-process."""
+    import anyio
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "server": ("snapshot", 80), "client": None,
+        "path": path, "raw_path": path.encode("latin-1"), "root_path": "",
+        "query_string": b"", "headers": [(b"host", b"snapshot"), (b"accept", b"application/json")],
+    }
+    response = {"status": 500, "headers": {}, "body": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in message["headers"]}
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    anyio.run(asgi_app, scope, receive, send)
+    return response["status"], response["headers"], b"".join(response["body"])
+
+
+def snapshot_paths():
+    """``/api/...`` paths of every parameterless-callable GET analytics route."""
+    from app.api import routes
+
+    paths = []
+    for name in SNAPSHOT_ROUTERS:
+        router = getattr(routes, name).router
+        for route in router.routes:
+            if "GET" in getattr(route, "methods", ()) and "{" not in route.path:
+                paths.append("/api" + route.path)
+    return paths
+
+
+def build(out=SNAPSHOT_DIR, keep=KEEP):
+    """Write a snapshot of the current dataset under ``out`` and make it current."""
+    from app.main import app as live_app
+    from app.services import dataset_service
+
+    version = dataset_service.dataset_version()
+    os.makedirs(out, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".build-", dir=out)
+
+    manifest = {"version": version, "built_at": time.time(), "routes": {}}
+    for path in snapshot_paths():
+        status, headers, body = _get(live_app, path)
+        if status != 200:
+            shutil.rmtree(staging)
+            raise RuntimeError(f"{path} answered {status}: {body[:200]!r}")
+
+        media_type = headers.get("content-type", "application/json").split(";")[0]
+        file = path.lstrip("/") + SUFFIXES.get(media_type, "")
+        target = os.path.join(staging, file)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(body)
+        with open(target + ".gz", "wb") as f:
+            f.write(gzip.compress(body, mtime=0))
+
+        manifest["routes"][path] = {
+            "file": file,
+            "content_type": headers.get("content-type", media_type),
+            "etag": headers.get("etag"),
+            "bytes": len(body),
+        }
+
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    final = os.path.join(out, version)
+    if os.path.exists(final):
+        shutil.rmtree(final)
+    os.replace(staging, final)
+    _write_current(out, version)
+    _prune(out, keep)
+    return final, manifest
+
+
+def _write_current(out, version):
+    fd, tmp = tempfile.mkstemp(prefix=".current-", dir=out)
+    with os.fdopen(fd, "w") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(out, "CURRENT"))          # atomic switch for servers
+
+
+def _prune(out, keep):
+    versions = [
+        entry for entry in os.scandir(out)
+        if entry.is_dir() and not entry.name.startswith(".")
+        and os.path.exists(os.path.join(entry.path, "manifest.json"))
+    ]
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in versions[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+# ===========================
+# SERVE
+# ===========================
+
+class Snapshot:
+    """One loaded snapshot version: route path -> (headers, body, gzip body)."""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["version"]
+        self.routes = {}
+        for path, meta in self.manifest["routes"].items():
+            target = os.path.join(directory, meta["file"])
+            with open(target, "rb") as f:
+                body = f.read()
+            with open(target + ".gz", "rb") as f:
+                compressed = f.read()
+            self.routes[path] = (meta, body, compressed)
+
+
+class SnapshotApp:
+    """Read-only ASGI app answering snapshot routes from ``root``/CURRENT."""
+
+    def __init__(self, root=SNAPSHOT_DIR):
+        self.root = root
+        self.current = None
+        self.stamp = None
+        self.lock = threading.Lock()
+
+    def snapshot(self):
+        pointer = os.path.join(self.root, "CURRENT")
+        stamp = os.stat(pointer).st_mtime_ns
+        if stamp != self.stamp:
+            with self.lock:
+                if stamp != self.stamp:
+                    with open(pointer) as f:
+                        version = f.read().strip()
+                    self.current = Snapshot(os.path.join(self.root, version))
+                    self.stamp = stamp
+        return self.current
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                else:
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        try:
+            snapshot = self.snapshot()
+        except FileNotFoundError:
+            await _respond(send, 503, [], b'{"detail":"no snapshot built"}')
+            return
+
+        if scope["method"] not in ("GET", "HEAD"):
+            await _respond(send, 405, [(b"allow", b"GET, HEAD")], b'{"detail":"snapshot is read-only"}')
+            return
+        if scope["path"] == "/api/health":
+            await _respond(send, 200, [], json.dumps({"status": "ok", "snapshot": snapshot.version}).encode())
+            return
+
+        route = snapshot.routes.get(scope["path"])
+        if route is None:
+            await _respond(send, 404, [], b'{"detail":"not in snapshot"}')
+            return
+        if scope.get("query_string"):
+            await _respond(send, 400, [], b'{"detail":"snapshot routes take no query parameters"}')
+            return
+
+        meta, body, compressed = route
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        raw = [
+            (b"content-type", meta["content_type"].encode("latin-1")),
+            (b"cache-control", b"public, max-age=0, must-revalidate"),
+            (b"vary", b"Accept-Encoding"),
+            (b"x-snapshot", snapshot.version.encode("latin-1")),
+        ]
+        encoding = "gzip" if _accepts_gzip(headers.get("accept-encoding", "")) else "identity"
+        if encoding == "gzip":
+            raw.append((b"content-encoding", b"gzip"))
+            body = compressed
+
+        etag = meta.get("etag")
+        if etag:
+            tags = {"identity": etag, "gzip": etag[:-1] + '-gzip"'}
+            raw.append((b"etag", tags[encoding].encode("latin-1")))
+            if any(tag in headers.get("if-none-match", "") for tag in tags.values()):
+                await _respond(send, 304, raw, b"")
+                return
+
+        await _respond(send, 200, raw, b"" if scope["method"] == "HEAD" else body, len(body))
+
+
+def _accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding value allows gzip, q-values included."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, *params = [piece.strip() for piece in part.split(";")]
+        if not name:
+            continue
+        weight = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.lower()] = weight
+    return weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0))) > 0
+
+
+async def _respond(send, status, raw, body, length=None):
+    if not any(name == b"content-type" for name, _ in raw):
+        raw = raw + [(b"content-type", b"application/json")]
+    if status != 304:
+        raw = raw + [(b"content-length", str(len(body) if length is None else length).encode("latin-1"))]
+    await send({"type": "http.response.start", "status": status, "headers": raw})
+    await send({"type": "http.response.body", "body": body})
+
+
+app = SnapshotApp()
+
+
+# ===========================
+# CLI
+# ===========================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.snapshot", description="Static analytics snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = commands.add_parser("build", help="evaluate the analytics routes into a new snapshot")
+    build_cmd.add_argument("--out", default=SNAPSHOT_DIR)
+    build_cmd.add_argument("--keep", type=int, default=KEEP)
+
+    serve_cmd = commands.add_parser("serve", help="serve the current snapshot read-only")
+    serve_cmd.add_argument("--dir", default=SNAPSHOT_DIR)
+    serve_cmd.add_argument("--host", default="0.0.0.0")
+    serve_cmd.add_argument("--port", type=int, default=8000)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        directory, manifest = build(args.out, args.keep)
+        print(f"snapshot {manifest['version']}: {len(manifest['routes'])} routes -> {directory}")
+        return 0
+
+    import uvicorn
+    uvicorn.run(SnapshotApp(args.dir), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import gc
+import os
+
+# ===========================
+# PRODUCTION SERVER
+# ===========================
+#
+#     gunicorn -c gunicorn.conf.py
+#
+# The master imports app.main (which loads the ml_service pipeline), then
+# loads the dataset and every registered derived structure (cube, bitmap
+# and range indexes) before forking. Workers inherit all of it copy-on-
+# write. gc.freeze() moves those objects out of the collector's reach, so
+# the workers' collections do not write to their pages and un-share them.
+#
+# Worker count, recycling and restart timing come from the environment:
+#
+#   WEB_CONCURRENCY       workers (default: one per core)
+#   MAX_REQUESTS          recycle a worker after this many requests (0 = never)
+#   MAX_REQUESTS_JITTER   random extra requests so workers do not recycle together
+#   GRACEFUL_TIMEOUT      seconds a stopping worker may finish in-flight requests
+#
+# Recycled workers are re-forked from the warm master, so they start
+# without loading anything unless the data moved on since the preload: the
+# app's startup then reloads a newer drop and applies logged sales before
+# the worker accepts requests. `kill -HUP <master>` replaces all workers
+# gracefully. A new data drop is picked up by each worker's watcher; the
+# reloaded columns (sidecar mmap) and indexes (shared_arena) are mapped
+# from the same files by every worker, so they stay shared too.
+#
+# Arena versions are held by the workers that use them, never by the
+# master: it disowns what it loaded and each worker adopts it after the
+# fork, so a version is freed once every worker has reloaded past it.
+
+wsgi_app = "app.main:app"
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+max_requests = int(os.environ.get("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", "0"))
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("WORKER_TIMEOUT", "120"))
+keepalive = 5
+
+
+def when_ready(server):
+    # The app is already imported (preload_app); build the shared state once
+    from app.services import dataset_service, shared_arena
+
+    dataset = dataset_service.get_dataset()
+    server.log.info("Preloaded dataset %s (%s)", dataset_service.dataset_version(),
+                    ", ".join(sorted(dataset.info()["derived"])))
+    if shared_arena.enabled():
+        shared_arena.disown()
+    gc.collect()
+    gc.freeze()
+
+
+def pre_fork(server, worker):
+    # Objects the master allocated since the last fork join the frozen set too
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app.services import shared_arena
+
+    if shared_arena.enabled():
+        shared_arena.adopt()
@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import requests
+
+# ---------------------------------------------------
+# API TABLE LOADER
+# ---------------------------------------------------
+# Table endpoints answer with an Arrow IPC stream when asked for one, so
+# pages get a DataFrame without JSON encoding on the backend or decoding
+# here. Anything else (errors, multi-section payloads) still comes as JSON.
+#
+# The last frame of the VALIDATED_URLS most recently used URLs is kept
+# with its ETag and revalidated with If-None-Match; a 304 reuses it without
+# transferring or decoding a body.
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+VALIDATED_URLS = 64         # filtered URLs are unbounded; keep the recent ones
+
+_validated = OrderedDict()  # url -> (etag, frame), least recently used first
+_validated_lock = threading.Lock()
+
+
+def _decode(res):
+    if res.headers.get("content-type", "").startswith(ARROW_STREAM):
+        return pa.ipc.open_stream(res.content).read_pandas()
+
+    data = res.json()
+    if isinstance(data, dict):
+        data = [data]
+    return pd.DataFrame(data)
+
+
+def fetch_frame(url, timeout=8):
+    headers = {"Accept": f"{ARROW_STREAM}, application/json"}
+    with _validated_lock:
+        cached = _validated.get(url)
+        if cached is not None:
+            _validated.move_to_end(url)
+            headers["If-None-Match"] = cached[0]
+
+    res = requests.get(url, headers=headers, timeout=timeout)
+    if res.status_code == 304 and cached is not None:
+        return cached[1].copy()
+    res.raise_for_status()
+
+    frame = _decode(res)
+    if "ETag" in res.headers:
+        with _validated_lock:
+            _validated[url] = (res.headers["ETag"], frame.copy())
+            _validated.move_to_end(url)
+            while len(_validated) > VALIDATED_URLS:
+                _validated.popitem(last=False)
+    return frame
@@ -3,6 +3,7 @@ import requests
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
+from components.ui_helpers import fetch_frame
 
 API_BASE = "http://localhost:8000/api"
 
@@ -118,9 +119,7 @@ st.markdown("""
 # ---------------------------------------------------
 def load_api(endpoint):
     try:
-        r = requests.get(f"{API_BASE}{endpoint}", timeout=8)
-        r.raise_for_status()
-        return pd.DataFrame(r.json())
+        return fetch_frame(f"{API_BASE}{endpoint}")
     except:
         return pd.DataFrame()
     
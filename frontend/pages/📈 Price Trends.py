@@ -3,6 +3,7 @@ import requests
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
+from components.ui_helpers import fetch_frame
 
 API_BASE = "http://localhost:8000/api"
 
@@ -150,14 +151,7 @@ with st.sidebar:
 # ---------------------------------------------------
 def load_api_data(endpoint):
     try:
-        res = requests.get(f"{API_BASE}{endpoint}", timeout=8)
-        res.raise_for_status()
-        data = res.json()
-
-        if isinstance(data, dict):
-            data = [data]
-
-        df = pd.DataFrame(data)
+        df = fetch_frame(f"{API_BASE}{endpoint}")
         df.columns = df.columns.str.strip()
         return df
     except Exception as e:
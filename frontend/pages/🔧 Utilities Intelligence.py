@@ -3,6 +3,7 @@ import requests
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
+from components.ui_helpers import fetch_frame
 
 API_BASE = "http://localhost:8000/api"
 
@@ -118,9 +119,7 @@ st.markdown("""
 # ---------------------------------------------------
 def load_api(endpoint):
     try:
-        r = requests.get(f"{API_BASE}{endpoint}", timeout=8)
-        r.raise_for_status()
-        return pd.DataFrame(r.json())
+        return fetch_frame(f"{API_BASE}{endpoint}")
     except:
         return pd.DataFrame()
     
@@ -161,7 +160,6 @@ with st.sidebar:
 central_air = load_api("/utilities/central-air")
 heating_qc = load_api("/utilities/heating-quality")
 electrical = load_api("/utilities/electrical")
-garage_age = load_api("/utilities/garage-age")
 
 try:
     utilities_summary = requests.get(f"{API_BASE}/utilities/summary").json()
@@ -174,10 +172,14 @@ def filter_price(df):
         return df[df["House Sale Price"] >= min_price]
     return df
 
+garage_age = load_api(f"/utilities/garage-age?price_min={min_price}")   # filtered on the server
+if garage_age.empty:
+    # A snapshot server only has the unfiltered route: filter it here
+    garage_age = filter_price(load_api("/utilities/garage-age"))
+
 central_air = filter_price(central_air)
 heating_qc = filter_price(heating_qc)
 electrical = filter_price(electrical)
-garage_age = filter_price(garage_age)
 
 # ---------------------------------------------------
 # KPI SECTION
@@ -4,6 +4,7 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import plotly.io as pio
+from components.ui_helpers import fetch_frame
 
 st.set_page_config(page_title="Property Features", page_icon="🏗️", layout="wide")
 
@@ -132,12 +133,7 @@ st.markdown("""
 @st.cache_data(ttl=600)
 def load_api_data(endpoint):
     try:
-        res = requests.get(f"{API_BASE}{endpoint}", timeout=8)
-        res.raise_for_status()
-        data = res.json()
-        if isinstance(data, dict):
-            data = [data]
-        df = pd.DataFrame(data)
+        df = fetch_frame(f"{API_BASE}{endpoint}")
         df.columns = df.columns.str.strip()
         return df
     except: